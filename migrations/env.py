@@ -10,6 +10,7 @@ from sqlmodel import SQLModel
 from src.auth.models import User  # noqa: F401
 from src.books.models import Book  # noqa: F401
 from src.config import Config
+from src.outbox import OutboxMessage  # noqa: F401
 from src.reviews.models import Review  # noqa: F401
 
 # this is the Alembic Config object, which provides
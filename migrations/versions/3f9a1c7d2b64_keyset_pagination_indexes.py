@@ -0,0 +1,65 @@
+"""keyset pagination indexes
+
+Revision ID: 3f9a1c7d2b64
+Revises: 782d3670a0a3
+Create Date: 2024-11-20 09:12:41.318204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9a1c7d2b64"
+down_revision: Union[str, None] = "782d3670a0a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_books_created_at_id",
+            "books",
+            ["created_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_books_user_id_created_at_id",
+            "books",
+            ["user_id", "created_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_reviews_created_at_id",
+            "reviews",
+            ["created_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_reviews_created_at_id",
+            table_name="reviews",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_books_user_id_created_at_id",
+            table_name="books",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_books_created_at_id",
+            table_name="books",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,38 @@
+"""store password hashes as text
+
+Revision ID: a52e90c4d1f7
+Revises: 3f9a1c7d2b64
+Create Date: 2024-11-21 14:03:27.905112
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a52e90c4d1f7"
+down_revision: Union[str, None] = "3f9a1c7d2b64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Hashes used to be stored as the repr of a bytes object: b'$2b$12$...'
+    op.execute(
+        """
+        UPDATE users
+        SET password = substr(password, 3, length(password) - 3)
+        WHERE password LIKE 'b''%'''
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        UPDATE users
+        SET password = 'b''' || password || ''''
+        WHERE password NOT LIKE 'b''%'''
+        """
+    )
@@ -0,0 +1,68 @@
+"""index lookup columns
+
+Revision ID: c81d3b5e6a09
+Revises: a52e90c4d1f7
+Create Date: 2024-11-25 10:47:52.116830
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c81d3b5e6a09"
+down_revision: Union[str, None] = "a52e90c4d1f7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block. If one
+    # fails (e.g. duplicate emails) Postgres leaves an INVALID index behind;
+    # drop it, fix the data and rerun.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_email",
+            "users",
+            ["email"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_reviews_book_id",
+            "reviews",
+            ["book_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_reviews_user_id",
+            "reviews",
+            ["user_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_reviews_user_id",
+            table_name="reviews",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_reviews_book_id",
+            table_name="reviews",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_users_email",
+            table_name="users",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,41 @@
+"""cascade review deletes
+
+Revision ID: d4e27f9b0c18
+Revises: c81d3b5e6a09
+Create Date: 2024-11-26 16:21:08.650327
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4e27f9b0c18"
+down_revision: Union[str, None] = "c81d3b5e6a09"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Recreate the constraint as NOT VALID and validate it in its own
+    # transaction so writes to reviews aren't blocked while rows are checked.
+    op.drop_constraint("reviews_book_id_fkey", "reviews", type_="foreignkey")
+    op.create_foreign_key(
+        "reviews_book_id_fkey",
+        "reviews",
+        "books",
+        ["book_id"],
+        ["id"],
+        ondelete="CASCADE",
+        postgresql_not_valid=True,
+    )
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE reviews VALIDATE CONSTRAINT reviews_book_id_fkey")
+
+
+def downgrade() -> None:
+    op.drop_constraint("reviews_book_id_fkey", "reviews", type_="foreignkey")
+    op.create_foreign_key(
+        "reviews_book_id_fkey", "reviews", "books", ["book_id"], ["id"]
+    )
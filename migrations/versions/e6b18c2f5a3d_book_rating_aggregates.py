@@ -0,0 +1,90 @@
+"""book rating aggregates
+
+Revision ID: e6b18c2f5a3d
+Revises: d4e27f9b0c18
+Create Date: 2024-11-27 10:42:51.203118
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e6b18c2f5a3d"
+down_revision: Union[str, None] = "d4e27f9b0c18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "books",
+        sa.Column("review_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "books",
+        sa.Column("rating_sum", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "books",
+        sa.Column(
+            "rating_histogram",
+            postgresql.ARRAY(sa.Integer()),
+            server_default="{0,0,0,0,0}",
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        "books",
+        sa.Column("average_rating", sa.Float(), server_default="0", nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE books
+        SET review_count = agg.review_count,
+            rating_sum = agg.rating_sum,
+            rating_histogram = agg.rating_histogram,
+            average_rating = agg.rating_sum::float / agg.review_count
+        FROM (
+            SELECT book_id,
+                   count(*) AS review_count,
+                   sum(rating) AS rating_sum,
+                   ARRAY[
+                       count(*) FILTER (WHERE rating = 1),
+                       count(*) FILTER (WHERE rating = 2),
+                       count(*) FILTER (WHERE rating = 3),
+                       count(*) FILTER (WHERE rating = 4),
+                       count(*) FILTER (WHERE rating = 5)
+                   ] AS rating_histogram
+            FROM reviews
+            WHERE book_id IS NOT NULL
+            GROUP BY book_id
+        ) AS agg
+        WHERE books.id = agg.book_id
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_books_average_rating_id",
+            "books",
+            ["average_rating", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_books_average_rating_id",
+            table_name="books",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("books", "average_rating")
+    op.drop_column("books", "rating_histogram")
+    op.drop_column("books", "rating_sum")
+    op.drop_column("books", "review_count")
@@ -0,0 +1,63 @@
+"""book search indexes
+
+Revision ID: f3c95a7d1e42
+Revises: e6b18c2f5a3d
+Create Date: 2024-11-28 09:13:37.482961
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c95a7d1e42"
+down_revision: Union[str, None] = "e6b18c2f5a3d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match src.books.models.search_document for queries to use the index.
+SEARCH_DOCUMENT = (
+    "(setweight(to_tsvector('simple', title), 'A')"
+    " || setweight(to_tsvector('simple', author), 'B'))"
+    " || setweight(to_tsvector('simple', publisher), 'C')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_books_search_document",
+            "books",
+            [sa.text(f"({SEARCH_DOCUMENT})")],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_books_title_trgm",
+            "books",
+            ["title"],
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_books_title_trgm",
+            table_name="books",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_books_search_document",
+            table_name="books",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
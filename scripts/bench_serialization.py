@@ -0,0 +1,132 @@
+"""Compare response serialization paths on a large page of nested books.
+
+Run from the repository root with the app's environment configured:
+
+    python -m scripts.bench_serialization --books 1000 --reviews 20
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import TypeAdapter
+
+from src.auth.models import User
+from src.books.models import Book
+from src.books.schemas import BookPublicWithUserAndReviews
+from src.responses import dump_json
+from src.reviews.models import Review
+
+ResponseModel = list[BookPublicWithUserAndReviews]
+
+
+def make_books(count: int, reviews_per_book: int) -> list[Book]:
+    now = datetime.now()
+    users = [
+        User(
+            id=uuid.uuid4(),
+            email=f"user{i}@example.com",
+            password="x" * 60,
+            username=f"user{i}",
+            first_name="First",
+            last_name="Last",
+            role="user",
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(100)
+    ]
+    books = []
+    for i in range(count):
+        user = users[i % len(users)]
+        book = Book(
+            id=uuid.uuid4(),
+            user_id=user.id,
+            title=f"Book {i}",
+            author="Author",
+            publisher="Publisher",
+            page_count=300,
+            language="English",
+            published_date=date(2020, 1, 1) + timedelta(days=i),
+            review_count=reviews_per_book,
+            rating_sum=reviews_per_book * 4,
+            rating_histogram=[0, 0, 0, reviews_per_book, 0],
+            average_rating=4.0,
+            created_at=now,
+            updated_at=now,
+        )
+        # Set through __dict__ so the ORM doesn't try to load the other side.
+        book.__dict__["user"] = user
+        book.__dict__["reviews"] = [
+            Review(
+                id=uuid.uuid4(),
+                user_id=user.id,
+                book_id=book.id,
+                content="A review. " * 20,
+                rating=4,
+                created_at=now,
+                updated_at=now,
+            )
+            for _ in range(reviews_per_book)
+        ]
+        books.append(book)
+    return books
+
+
+def response_model_path(response_class: type[JSONResponse]) -> Callable[[Any], bytes]:
+    """What FastAPI does for a `response_model` endpoint returning ORM objects."""
+    field = create_model_field(
+        name="Response_bench", type_=ResponseModel, mode="serialization"
+    )
+
+    def render(books: Any) -> bytes:
+        content = asyncio.run(serialize_response(field=field, response_content=books))
+        return bytes(response_class(content).body)
+
+    return render
+
+
+def dump_json_path() -> Callable[[Any], bytes]:
+    adapter = TypeAdapter(ResponseModel)
+    return lambda books: dump_json(adapter, books)
+
+
+def bench(render: Callable[[Any], bytes], books: list[Book], rounds: int) -> float:
+    render(books)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        render(books)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--reviews", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    books = make_books(args.books, args.reviews)
+    paths = {
+        "response_model + JSONResponse": response_model_path(JSONResponse),
+        "response_model + ORJSONResponse": response_model_path(ORJSONResponse),
+        "TypeAdapter.dump_json": dump_json_path(),
+    }
+    baseline = None
+    for name, render in paths.items():
+        seconds = bench(render, books, args.rounds)
+        baseline = baseline or seconds
+        print(f"{name:<34} {seconds * 1000:9.1f} ms  {baseline / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import uuid
+from dataclasses import dataclass
+
+from src.cache import TTLCache
+from src.config import Config
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    id: uuid.UUID
+    email: str
+    role: str
+    is_verified: bool
+
+
+# Per-process, so other workers may serve a stale entry for up to the TTL
+# after an update.
+user_cache = TTLCache[uuid.UUID, AuthenticatedUser](
+    maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL
+)
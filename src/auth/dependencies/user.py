@@ -1,3 +1,4 @@
+import uuid
 from enum import Enum
 from typing import Annotated
 
@@ -5,6 +6,7 @@ from fastapi import Depends, HTTPException, status
 
 from src.database import SessionDep
 
+from ..cache import AuthenticatedUser
 from ..models import User
 from ..service import AuthServiceDep
 from .token import AccessTokenDep
@@ -13,12 +15,25 @@ from .token import AccessTokenDep
 async def get_current_user(
     token: AccessTokenDep, session: SessionDep, service: AuthServiceDep
 ) -> User:
-    return await service.get_user(token.user.get("email", ""), session)
+    return await service.get_user_with_books_and_reviews(
+        uuid.UUID(token.user["user_id"]), session
+    )
 
 
 CurrentUserDep = Annotated[User, Depends(get_current_user)]
 
 
+async def get_authenticated_user(
+    token: AccessTokenDep, session: SessionDep, service: AuthServiceDep
+) -> AuthenticatedUser:
+    return await service.get_authenticated_user(
+        uuid.UUID(token.user["user_id"]), session
+    )
+
+
+AuthenticatedUserDep = Annotated[AuthenticatedUser, Depends(get_authenticated_user)]
+
+
 class UserRole(Enum):
     ADMIN = "admin"
     USER = "user"
@@ -28,7 +43,7 @@ class RoleChecker:
     def __init__(self, allowed_roles: list[UserRole]) -> None:
         self.allowed_roles = allowed_roles
 
-    def __call__(self, user: CurrentUserDep) -> None:
+    def __call__(self, user: AuthenticatedUserDep) -> None:
         if not user.is_verified:
             raise HTTPException(
                 status.HTTP_403_FORBIDDEN, detail="Account not verified."
@@ -40,3 +55,4 @@ class RoleChecker:
 
 
 admin_user_role_checker = Depends(RoleChecker([UserRole.ADMIN, UserRole.USER]))
+admin_role_checker = Depends(RoleChecker([UserRole.ADMIN]))
@@ -0,0 +1,89 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Literal, TypeVar
+
+from fastapi import HTTPException, status
+
+from src.config import Config
+
+from .utils import check_password, generate_password_hash, password_needs_rehash
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a bounded worker pool.
+
+    New hashes use `rounds` as the bcrypt cost. At most `max_workers` hashes
+    run at once. Callers beyond that wait for a slot, and once `max_pending`
+    calls are in flight new ones are rejected with a 503 instead of queueing
+    without bound.
+    """
+
+    def __init__(
+        self,
+        executor_type: Literal["thread", "process"],
+        max_workers: int,
+        max_pending: int,
+        rounds: int,
+    ) -> None:
+        self.rounds = rounds
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Executor | None = None
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._pending = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = (
+                ProcessPoolExecutor(max_workers=self.max_workers)
+                if self.executor_type == "process"
+                else ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="bcrypt"
+                )
+            )
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        return await self._run(generate_password_hash, password, self.rounds)
+
+    async def verify(self, password: str, password_hash: str) -> None:
+        if not await self._run(check_password, password, password_hash):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password"
+            )
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return password_needs_rehash(password_hash, self.rounds)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self._pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry later.",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self._pending -= 1
+
+
+password_hasher = PasswordHasher(
+    executor_type=Config.PASSWORD_HASH_EXECUTOR,
+    max_workers=Config.PASSWORD_HASH_WORKERS,
+    max_pending=Config.PASSWORD_HASH_MAX_PENDING,
+    rounds=Config.PASSWORD_HASH_ROUNDS,
+)
@@ -21,7 +21,7 @@ class User(SQLModel, table=True):
             default=uuid.uuid4,
         )
     )
-    email: EmailStr
+    email: EmailStr = Field(unique=True, index=True)
     password: str
     username: str
     first_name: str
@@ -31,12 +31,14 @@ class User(SQLModel, table=True):
     )
     is_verified: bool = False
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+    updated_at: datetime = Field(
+        sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now)
+    )
     books: list["Book"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise"}
     )
     reviews: list["Review"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise"}
     )
 
     def __repr__(self) -> str:
@@ -1,8 +1,18 @@
+import asyncio
+import contextlib
+import logging
+
 from redis.asyncio import Redis
 
+from src.cache import TTLCache
 from src.config import Config
 
 JTI_EXPIRY = 3600
+REVOCATION_CHANNEL = "token-revocations"
+LISTEN_RETRY_SECONDS = 0.5
+LISTEN_RETRY_MAX_SECONDS = 30
+
+logger = logging.getLogger(__name__)
 
 token_blocklist = Redis(
     host=Config.REDIS_HOST,
@@ -12,9 +22,102 @@ token_blocklist = Redis(
 )
 
 
+class BlocklistChecker:
+    """Answers blocklist lookups from a local cache of recently seen JTIs.
+
+    Tokens found not revoked are cached for `Config.TOKEN_CACHE_TTL` seconds,
+    which bounds how long another worker's revocation can go unnoticed if its
+    pub/sub message is lost. The subscription is started with the app and
+    reconnects with backoff; the cache is dropped on every (re)subscribe since
+    revocations may have been missed while unsubscribed. Cache misses from the
+    same event-loop tick share one MGET.
+    """
+
+    def __init__(self, redis: Redis, cache: TTLCache[str, bool]) -> None:
+        self.redis = redis
+        self.cache = cache
+        self._pending: dict[str, asyncio.Future[bool]] = {}
+        self._lookup: asyncio.Task[None] | None = None
+        self._listener: asyncio.Task[None] | None = None
+        self.subscribed = asyncio.Event()
+
+    def start(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+    async def is_revoked(self, jti: str) -> bool:
+        self.start()
+        if (revoked := self.cache.get(jti)) is not None:
+            return revoked
+        if (future := self._pending.get(jti)) is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[jti] = future
+            if self._lookup is None:
+                self._lookup = asyncio.create_task(self._lookup_pending())
+        return await asyncio.shield(future)
+
+    def revoke(self, jti: str) -> None:
+        self.cache.set(jti, True, ttl=JTI_EXPIRY)
+
+    async def _lookup_pending(self) -> None:
+        await asyncio.sleep(0)  # let the other misses of this tick join the batch
+        batch, self._pending, self._lookup = self._pending, {}, None
+        try:
+            values = await self.redis.mget(list(batch))
+        except BaseException as e:
+            # Waiters are shielded, so fail them even if the lookup was cancelled.
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for (jti, future), value in zip(batch.items(), values):
+            if revoked := value is not None:
+                self.revoke(jti)
+            else:
+                self.cache.set(jti, False)
+            future.set_result(revoked)
+
+    async def _listen(self) -> None:
+        delay = LISTEN_RETRY_SECONDS
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(REVOCATION_CHANNEL)
+                    self.cache.clear()
+                    self.subscribed.set()
+                    delay = LISTEN_RETRY_SECONDS
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.revoke(message["data"])
+            except Exception:
+                logger.warning("Lost token revocation subscription", exc_info=True)
+            self.subscribed.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, LISTEN_RETRY_MAX_SECONDS)
+
+
+blocklist_checker = BlocklistChecker(
+    token_blocklist,
+    TTLCache[str, bool](maxsize=Config.TOKEN_CACHE_SIZE, ttl=Config.TOKEN_CACHE_TTL),
+)
+
+
 async def add_jti_to_blocklist(jti: str) -> None:
-    await token_blocklist.set(name=jti, value="", ex=JTI_EXPIRY)
+    async with token_blocklist.pipeline(transaction=False) as pipe:
+        pipe.set(name=jti, value="", ex=JTI_EXPIRY)
+        pipe.publish(REVOCATION_CHANNEL, jti)
+        await pipe.execute()
+    blocklist_checker.revoke(jti)
 
 
 async def token_in_blocklist(jti: str) -> bool:
-    return await token_blocklist.get(jti) is not None
+    return await blocklist_checker.is_revoked(jti)
@@ -1,15 +1,17 @@
 from datetime import UTC, datetime
 
 from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 from src.auth.utils import create_url_safe_token
-from src.celery import send_email
-from src.config import Config
-from src.database import SessionDep
+from src.celery import send_template_email
+from src.database import PrimarySessionDep, SessionDep
+from src.email import EmailTemplate
+from src.tasks import dispatcher
 
 from .dependencies.token import AccessTokenDep, RefreshTokenDep
 from .dependencies.user import CurrentUserDep
+from .hashing import password_hasher
 from .models import User
 from .redis import add_jti_to_blocklist
 from .schemas import (
@@ -21,12 +23,7 @@ from .schemas import (
     UserPublicWithBooksAndReviews,
 )
 from .service import AuthServiceDep
-from .utils import (
-    create_token,
-    decode_url_safe_token,
-    generate_password_hash,
-    verify_password,
-)
+from .utils import create_token, decode_url_safe_token
 
 router = APIRouter()
 
@@ -45,24 +42,17 @@ async def create_user(
             detail=f"User with email {user.email} already exists.",
         )
     user.password = user.password.replace("\x00", "")
-    user_created = await service.create_user(user, session)
-    html = f"""
-    <h1>Verify your email</h1>
-    <p>Please click this <a href="http://{Config.DOMAIN}/api/v1/auth/verify/{create_url_safe_token({"email": user_created.email})}">link</a> to verify your email</p>
-    """
-    send_email.delay([user_created.email], "Verify your email", html)
-
-    return user_created
+    return await service.create_user(user, session)
 
 
 @router.get("/verify/{url_safe_token}", status_code=status.HTTP_200_OK)
 async def verify_user_account(
-    url_safe_token: str, session: SessionDep, service: AuthServiceDep
-) -> JSONResponse:
+    url_safe_token: str, session: PrimarySessionDep, service: AuthServiceDep
+) -> ORJSONResponse:
     if not (email := decode_url_safe_token(url_safe_token).get("email")):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     await service.update_user(email, {"is_verified": True}, session)
-    return JSONResponse(content={"message": "Account verified successfully."})
+    return ORJSONResponse(content={"message": "Account verified successfully."})
 
 
 @router.post("/login", response_model=UserLoginResponse)
@@ -70,7 +60,13 @@ async def login(
     user: UserLogin, session: SessionDep, service: AuthServiceDep
 ) -> UserLoginResponse:
     existing_user = await service.get_user(user.email, session)
-    verify_password(user.password, eval(existing_user.password))
+    await password_hasher.verify(user.password, existing_user.password)
+    if password_hasher.needs_rehash(existing_user.password):
+        await service.update_user(
+            existing_user.email,
+            {"password": await password_hasher.hash(user.password)},
+            session,
+        )
 
     user_data = {
         "email": existing_user.email,
@@ -93,29 +89,32 @@ async def get_current_user(user: CurrentUserDep) -> User:
 @router.get("/refresh")
 async def refresh_access_token(
     refresh_token: RefreshTokenDep,
-) -> JSONResponse:
+) -> ORJSONResponse:
     if datetime.fromtimestamp(refresh_token.exp, tz=UTC) > datetime.now(UTC):
-        return JSONResponse(content={"access_token": create_token(refresh_token.user)})
+        return ORJSONResponse(
+            content={"access_token": create_token(refresh_token.user)}
+        )
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED, detail="Expired refresh token."
     )
 
 
 @router.get("/logout")
-async def logout(access_token: AccessTokenDep) -> JSONResponse:
+async def logout(access_token: AccessTokenDep) -> ORJSONResponse:
     await add_jti_to_blocklist(access_token.jti)
-    return JSONResponse(
+    return ORJSONResponse(
         content={"message": "Logout Successfully."}, status_code=status.HTTP_200_OK
     )
 
 
 @router.post("/reset-password-request", status_code=status.HTTP_200_OK)
 async def reset_password_request(request: PasswordResetRequest) -> None:
-    html = f"""
-    <h1>Verify your password</h1>
-    <p>Please click this <a href="http://{Config.DOMAIN}/api/v1/auth/password-reset/{create_url_safe_token({"email": request.email})}">link</a> to reset your password</p>
-    """
-    send_email.delay([request.email], "Verify your password", html)
+    dispatcher.dispatch(
+        send_template_email,
+        [request.email],
+        EmailTemplate.RESET_PASSWORD,
+        {"token": create_url_safe_token({"email": request.email})},
+    )
 
 
 @router.post("/password-reset/{url_safe_token}")
@@ -124,7 +123,7 @@ async def reset_password(
     passwords: PasswordReset,
     session: SessionDep,
     service: AuthServiceDep,
-) -> JSONResponse:
+) -> ORJSONResponse:
     if not passwords.new_password == passwords.new_password_confirm:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Passwords do not match."
@@ -133,7 +132,7 @@ async def reset_password(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     await service.update_user(
         email,
-        {"password": str(generate_password_hash(passwords.new_password))},
+        {"password": await password_hasher.hash(passwords.new_password)},
         session,
     )
-    return JSONResponse(content={"message": "Password reset successfully."})
+    return ORJSONResponse(content={"message": "Password reset successfully."})
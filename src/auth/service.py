@@ -1,13 +1,22 @@
+import uuid
 from typing import Annotated, Any
 
 from fastapi import Depends, HTTPException, status
 from pydantic import EmailStr
-from sqlmodel import select
+from sqlalchemy.orm import selectinload
+from sqlmodel import select, update
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.celery import send_template_email
+from src.email import EmailTemplate
+from src.outbox import add_outbox_message
+from src.response_cache import response_cache
+
+from .cache import AuthenticatedUser, user_cache
+from .hashing import password_hasher
 from .models import User
 from .schemas import UserCreate
-from .utils import generate_password_hash
+from .utils import create_url_safe_token
 
 
 class AuthService:
@@ -20,27 +29,83 @@ class AuthService:
             )
         return result
 
+    async def get_user_with_books_and_reviews(
+        self, user_id: uuid.UUID, session: AsyncSession
+    ) -> User:
+        result = await session.exec(
+            select(User)
+            .where(User.id == user_id)
+            .options(selectinload(User.books), selectinload(User.reviews))  # type: ignore[arg-type]
+        )
+        if (result := result.first()) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User with id {user_id} does not exists.",
+            )
+        return result
+
+    async def get_authenticated_user(
+        self, user_id: uuid.UUID, session: AsyncSession
+    ) -> AuthenticatedUser:
+        if (user := user_cache.get(user_id)) is not None:
+            return user
+        result = await session.exec(
+            select(User.id, User.email, User.role, User.is_verified).where(
+                User.id == user_id
+            )
+        )
+        if (row := result.first()) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User with id {user_id} does not exists.",
+            )
+        user = AuthenticatedUser(**row._asdict())
+        user_cache.set(user_id, user)
+        return user
+
     async def user_exists(self, email: EmailStr, session: AsyncSession) -> bool:
         result = await session.exec(select(User).where(User.email == email))
         return result.first() is not None
 
     async def create_user(self, user: UserCreate, session: AsyncSession) -> User:
         user_create = User(**user.model_dump())
-        user_create.password = str(generate_password_hash(user_create.password))
+        user_create.password = await password_hasher.hash(user_create.password)
         user_create.role = "user"
         user_create.books = []
         user_create.reviews = []
         session.add(user_create)
+        # Committed with the user, so the verification email can't get lost.
+        await add_outbox_message(
+            session,
+            send_template_email.name,
+            [user_create.email],
+            EmailTemplate.VERIFY_EMAIL,
+            {"token": create_url_safe_token({"email": user_create.email})},
+        )
         await session.commit()
         return user_create
 
     async def update_user(
         self, email: str, user_data: dict[str, Any], session: AsyncSession
     ) -> User:
-        user_update = await self.get_user(email, session)
-        for k, v in user_data.items():
-            setattr(user_update, k, v)
+        result = await session.exec(
+            select(User)
+            .from_statement(
+                update(User)
+                .where(User.email == email)  # type: ignore[arg-type]
+                .values(**user_data)
+                .returning(User)
+            )
+            .execution_options(populate_existing=True)
+        )
+        if (user_update := result.scalar_one_or_none()) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User with email {email} does not exists.",
+            )
         await session.commit()
+        user_cache.pop(user_update.id)
+        await response_cache.invalidate(f"user:{user_update.id}")
         return user_update
 
 
@@ -1,9 +1,24 @@
+import asyncio
+import uuid
+from collections.abc import AsyncGenerator
+
 import pytest
+import pytest_asyncio
+from fastapi import HTTPException
 from httpx import AsyncClient
 from pytest_mock import MockerFixture
+from redis.asyncio import Redis
+
+from src.cache import TTLCache
+from src.celery import send_template_email
+from src.config import Config
+from src.email import EmailTemplate
+from src.tasks import dispatcher
 
+from .hashing import PasswordHasher
+from .redis import REVOCATION_CHANNEL, BlocklistChecker
 from .schemas import UserCreate
-from .utils import create_url_safe_token
+from .utils import create_url_safe_token, generate_password_hash
 
 AUTH_ENDPOINT_PREFIX = "/api/v1/auth"
 
@@ -16,9 +31,8 @@ MOCK_LAST_NAME = "Doe"
 
 @pytest.mark.asyncio
 async def test_create_user(
-    test_async_client: AsyncClient, mocker: MockerFixture
+    test_async_client: AsyncClient, sql_statements: list[str]
 ) -> None:
-    mock_send_email = mocker.patch("src.celery.send_email.apply_async", autospec=True)
     response = await test_async_client.post(
         f"{AUTH_ENDPOINT_PREFIX}/signup",
         json=UserCreate(
@@ -31,7 +45,10 @@ async def test_create_user(
     )
 
     assert response.status_code == 201
-    mock_send_email.assert_called_once()
+    # The verification email is queued in the user's transaction.
+    assert any(
+        statement.startswith("INSERT INTO outbox") for statement in sql_statements
+    )
 
 
 @pytest.mark.asyncio
@@ -87,6 +104,21 @@ async def test_get_current_user(
     assert data["last_name"] == MOCK_LAST_NAME
 
 
+@pytest.mark.asyncio
+async def test_get_current_user_query_count(
+    test_async_client: AsyncClient,
+    mock_logged_in_user: dict[str, str | dict[str, str]],
+    sql_statements: list[str],
+) -> None:
+    response = await test_async_client.get(
+        f"{AUTH_ENDPOINT_PREFIX}/me",
+        headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
+    )
+    assert response.status_code == 200
+    # The user, then one selectin query each for books and reviews.
+    assert len(sql_statements) <= 3, sql_statements
+
+
 @pytest.mark.asyncio
 async def test_refresh_access_token(
     test_async_client: AsyncClient, mock_logged_in_user: dict[str, str | dict[str, str]]
@@ -113,12 +145,19 @@ async def test_refresh_access_token_providing_access_token(
 
 
 @pytest.mark.asyncio
-async def test_reset_password_request(test_async_client: AsyncClient) -> None:
+async def test_reset_password_request(
+    test_async_client: AsyncClient, mocker: MockerFixture
+) -> None:
+    dispatch = mocker.patch.object(dispatcher, "dispatch")
     response = await test_async_client.post(
         f"{AUTH_ENDPOINT_PREFIX}/reset-password-request",
         json={"email": MOCK_USER_EMAIL},
     )
     assert response.status_code == 200
+    task, recipients, template, _ = dispatch.call_args.args
+    assert task is send_template_email
+    assert recipients == [MOCK_USER_EMAIL]
+    assert template is EmailTemplate.RESET_PASSWORD
 
 
 @pytest.mark.asyncio
@@ -147,3 +186,121 @@ async def test_reset_password_with_passwords_unmatch(
     )
     assert response.status_code == 400
     assert response.json() == {"detail": "Passwords do not match."}
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_sheds_load_when_queue_is_full() -> None:
+    hasher = PasswordHasher(
+        executor_type="thread", max_workers=1, max_pending=1, rounds=4
+    )
+    pending_hash = asyncio.create_task(hasher.hash(MOCK_USER_PASSWORD))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hasher.hash(MOCK_USER_PASSWORD)
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
+
+    await hasher.verify(MOCK_USER_PASSWORD, await pending_hash)
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_needs_rehash_on_cost_change() -> None:
+    hasher = PasswordHasher(
+        executor_type="thread", max_workers=1, max_pending=1, rounds=5
+    )
+    assert not hasher.needs_rehash(generate_password_hash(MOCK_USER_PASSWORD, 5))
+    assert hasher.needs_rehash(generate_password_hash(MOCK_USER_PASSWORD, 4))
+
+
+@pytest_asyncio.fixture
+async def blocklist_checker() -> AsyncGenerator[BlocklistChecker, None]:
+    redis = Redis(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        password=Config.REDIS_PASSWORD,
+        decode_responses=True,
+    )
+    checker = BlocklistChecker(redis, TTLCache[str, bool](maxsize=100, ttl=60))
+    checker.start()
+    await asyncio.wait_for(checker.subscribed.wait(), 5)
+    yield checker
+    await checker.stop()
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_blocklist_checker_batches_and_caches_lookups(
+    blocklist_checker: BlocklistChecker, mocker: MockerFixture
+) -> None:
+    revoked, valid = str(uuid.uuid4()), str(uuid.uuid4())
+    await blocklist_checker.redis.set(revoked, "", ex=60)
+    mget = mocker.spy(blocklist_checker.redis, "mget")
+
+    results = await asyncio.gather(
+        blocklist_checker.is_revoked(revoked),
+        blocklist_checker.is_revoked(valid),
+        blocklist_checker.is_revoked(valid),
+    )
+    assert results == [True, False, False]
+    mget.assert_called_once()
+    assert sorted(mget.call_args.args[0]) == sorted([revoked, valid])
+
+    assert await blocklist_checker.is_revoked(revoked)
+    assert not await blocklist_checker.is_revoked(valid)
+    mget.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_blocklist_checker_applies_published_revocations(
+    blocklist_checker: BlocklistChecker,
+) -> None:
+    jti = str(uuid.uuid4())
+    assert not await blocklist_checker.is_revoked(jti)
+
+    await blocklist_checker.redis.publish(REVOCATION_CHANNEL, jti)
+    for _ in range(100):
+        if await blocklist_checker.is_revoked(jti):
+            break
+        await asyncio.sleep(0.01)
+    assert await blocklist_checker.is_revoked(jti)
+
+
+@pytest.mark.asyncio
+async def test_blocklist_checker_fails_lookups_on_any_error(
+    blocklist_checker: BlocklistChecker, mocker: MockerFixture
+) -> None:
+    mocker.patch.object(
+        blocklist_checker.redis,
+        "mget",
+        new_callable=mocker.AsyncMock,
+        side_effect=[OSError("boom"), [None]],
+    )
+    jti = str(uuid.uuid4())
+
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            blocklist_checker.is_revoked(jti),
+            blocklist_checker.is_revoked(jti),
+            return_exceptions=True,
+        ),
+        5,
+    )
+    assert [type(result) for result in results] == [OSError, OSError]
+    assert not await blocklist_checker.is_revoked(jti)
+
+
+@pytest.mark.asyncio
+async def test_blocklist_checker_resubscribes_after_any_error(
+    blocklist_checker: BlocklistChecker, mocker: MockerFixture
+) -> None:
+    await blocklist_checker.stop()
+    blocklist_checker.subscribed.clear()
+    pubsub = blocklist_checker.redis.pubsub
+    mocker.patch.object(
+        blocklist_checker.redis, "pubsub", side_effect=[ValueError("boom"), pubsub()]
+    )
+
+    blocklist_checker.start()
+    await asyncio.wait_for(blocklist_checker.subscribed.wait(), 5)
@@ -14,15 +14,23 @@ ACCESS_TOKEN_EXPIRY = 3600  # seconds
 REFRESH_TOKEN_EXPIRY = 1  # day
 
 
-def generate_password_hash(password: str) -> bytes:
-    return bcrypt.hashpw(password.encode("utf-8"), salt=bcrypt.gensalt())
+BCRYPT_PREFIX = "2b"
 
 
-def verify_password(password: str, password_hash: bytes) -> None:
-    if not bcrypt.checkpw(password.encode("utf-8"), password_hash):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password"
-        )
+def generate_password_hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(
+        password.encode("utf-8"), salt=bcrypt.gensalt(rounds=rounds)
+    ).decode("ascii")
+
+
+def check_password(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("ascii"))
+
+
+def password_needs_rehash(password_hash: str, rounds: int) -> bool:
+    # bcrypt hashes look like `$2b$12$<salt+digest>`.
+    _, prefix, cost, *_ = password_hash.split("$")
+    return prefix != BCRYPT_PREFIX or int(cost) != rounds
 
 
 def create_token(
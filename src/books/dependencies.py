@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import Depends, Query
+
+from src.fieldsets import FieldSet, fieldset_dependency
+
+from .schemas import BookPublicWithUserAndReviews
+
+
+@dataclass
+class BookFilter:
+    author: Annotated[str | None, Query()] = None
+    language: Annotated[str | None, Query()] = None
+    min_rating: Annotated[float | None, Query(ge=0, le=5)] = None
+    max_rating: Annotated[float | None, Query(ge=0, le=5)] = None
+    created_after: Annotated[datetime | None, Query()] = None
+    created_before: Annotated[datetime | None, Query()] = None
+
+
+BookFilterDep = Annotated[BookFilter, Depends()]
+
+BookFieldSetDep = Annotated[
+    FieldSet,
+    Depends(fieldset_dependency(BookPublicWithUserAndReviews, ("user", "reviews"))),
+]
@@ -0,0 +1,71 @@
+import csv
+import json
+from collections.abc import AsyncIterator
+from enum import Enum
+from typing import Any
+
+from pydantic import ValidationError
+
+from src.schemas import validation_messages
+
+from .schemas import BookCreate, BookImportError
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+CONTENT_TYPES = {
+    "application/x-ndjson": ImportFormat.NDJSON,
+    "application/jsonl": ImportFormat.NDJSON,
+    "text/csv": ImportFormat.CSV,
+}
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    buffer = b""
+    async for chunk in chunks:
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", errors="replace").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def parse_books(
+    lines: AsyncIterator[str], fmt: ImportFormat
+) -> AsyncIterator[tuple[int, BookCreate] | BookImportError]:
+    """Validate each data row of an NDJSON or CSV stream against BookCreate.
+
+    Rows are numbered from 1, not counting the CSV header. CSV records may not
+    span lines.
+    """
+    header: list[str] | None = None
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            if fmt is ImportFormat.CSV:
+                values = next(csv.reader([line]))
+                if header is None:
+                    header = values
+                    continue
+                row += 1
+                if len(values) != len(header):
+                    raise ValueError(
+                        f"Expected {len(header)} columns, got {len(values)}."
+                    )
+                data: Any = dict(zip(header, values))
+            else:
+                row += 1
+                data = json.loads(line)
+            yield row, BookCreate.model_validate(data)
+        except ValidationError as e:
+            yield BookImportError(row=row, errors=validation_messages(e))
+        except ValueError as e:
+            yield BookImportError(row=row, errors=[str(e)])
@@ -1,9 +1,11 @@
 import uuid
 from datetime import date, datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import sqlalchemy.dialects.postgresql as pg
-from sqlmodel import Column, Field, Relationship, SQLModel
+from sqlalchemy import DDL, Integer, event, func, text
+from sqlalchemy.sql.elements import ColumnElement
+from sqlmodel import Column, Field, Index, Relationship, SQLModel
 
 if TYPE_CHECKING:
     from src.auth.models import User
@@ -12,6 +14,19 @@ if TYPE_CHECKING:
 
 class Book(SQLModel, table=True):
     __tablename__ = "books"  # type: ignore[reportAssignmentType]
+    __table_args__ = (
+        Index("ix_books_created_at_id", "created_at", "id"),
+        # Also serves as the index for the user_id foreign key.
+        Index("ix_books_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_books_average_rating_id", "average_rating", "id"),
+        # Trigram index for title prefix (autocomplete) matches.
+        Index(
+            "ix_books_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
 
     id: uuid.UUID = Field(
         sa_column=Column(
@@ -28,12 +43,52 @@ class Book(SQLModel, table=True):
     language: str
     published_date: date
     user_id: uuid.UUID | None = Field(default=None, foreign_key="users.id")
-    user: "User" = Relationship(back_populates="books")  # type: ignore  # noqa: F821
+    # Rating aggregates, kept in step with reviews by ReviewService.
+    review_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_sum: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # Review counts for ratings 1 to 5.
+    rating_histogram: list[int] = Field(
+        default_factory=lambda: [0] * 5,
+        sa_column=Column(
+            pg.ARRAY(Integer), nullable=False, server_default="{0,0,0,0,0}"
+        ),
+    )
+    average_rating: float = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    user: "User" = Relationship(  # type: ignore  # noqa: F821
+        back_populates="books", sa_relationship_kwargs={"lazy": "raise"}
+    )
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+    updated_at: datetime = Field(
+        sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now)
+    )
     reviews: list["Review"] = Relationship(
-        back_populates="book", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="book",
+        passive_deletes=True,
+        sa_relationship_kwargs={"lazy": "raise"},
     )
 
     def __repr__(self) -> str:
         return f"Book(title={self.title})"
+
+
+event.listen(
+    Book.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+)
+
+# Text search configuration for book documents and queries. 'simple' doesn't
+# stem or drop stop words, which suits titles and names in any language.
+SEARCH_CONFIG = text("'simple'")
+
+
+def _weighted_vector(column: ColumnElement[str], weight: str) -> ColumnElement[Any]:
+    return func.setweight(func.to_tsvector(SEARCH_CONFIG, column), text(f"'{weight}'"))
+
+
+# Indexed as an expression rather than stored, so book rows don't carry the
+# vector. Queries must use this exact expression for the index to apply.
+search_document = (
+    _weighted_vector(Book.__table__.c.title, "A")
+    .op("||")(_weighted_vector(Book.__table__.c.author, "B"))
+    .op("||")(_weighted_vector(Book.__table__.c.publisher, "C"))
+)
+Index("ix_books_search_document", search_document, postgresql_using="gin")
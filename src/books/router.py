@@ -1,28 +1,102 @@
 import uuid
-from collections.abc import Sequence
+from typing import Annotated
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlmodel import select
 
 from src.auth.dependencies.token import AccessTokenDep
-from src.auth.dependencies.user import admin_user_role_checker
-from src.database import SessionDep
+from src.auth.dependencies.user import admin_role_checker, admin_user_role_checker
+from src.database import PrimarySessionDep, SessionDep, SessionFactoryDep
+from src.exports import ExportFormat, export_response
+from src.http_cache import (
+    IfNoneMatch,
+    cached_json_response,
+    conditional_json_response,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
+from src.pagination import PageParamsDep
+from src.response_cache import response_cache
+from src.responses import json_response
+from src.schemas import Page, partial_model
 
+from .dependencies import BookFieldSetDep, BookFilterDep
+from .importer import CONTENT_TYPES, iter_lines, parse_books
 from .models import Book
-from .schemas import BookCreate, BookPublicWithUserAndReviews, BookUpdate
-from .service import BookServiceDep
+from .schemas import (
+    BookCreate,
+    BookImportResult,
+    BookPublicWithUserAndReviews,
+    BookSearch,
+    BookSort,
+    BookUpdate,
+)
+from .service import BookServiceDep, book_adapter
 
 router = APIRouter()
 
+BookPage = Page[partial_model(BookPublicWithUserAndReviews)]  # type: ignore[misc]
+book_page_adapter = TypeAdapter(BookPage)
+
 
 @router.get(
     "",
-    response_model=Sequence[BookPublicWithUserAndReviews],
+    response_model=BookPage,
     dependencies=[admin_user_role_checker],
 )
 async def get_books(
-    session: SessionDep, access_token: AccessTokenDep, service: BookServiceDep
-) -> Sequence[Book]:
-    return await service.get_books(session)
+    page: PageParamsDep,
+    filters: BookFilterDep,
+    fieldset: BookFieldSetDep,
+    session: SessionDep,
+    access_token: AccessTokenDep,
+    service: BookServiceDep,
+    sort: BookSort = BookSort.NEWEST,
+    if_none_match: IfNoneMatch = None,
+) -> Response:
+    books, next_cursor = await service.get_books(page, sort, filters, fieldset, session)
+    return conditional_json_response(
+        book_page_adapter,
+        {"items": [fieldset.dump(book) for book in books], "next_cursor": next_cursor},
+        if_none_match,
+        exclude_unset=True,
+    )
+
+
+@router.get("/export", dependencies=[admin_role_checker])
+async def export_books(
+    session_factory: SessionFactoryDep,
+    access_token: AccessTokenDep,
+    fmt: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON,
+    gzip: bool = False,
+) -> StreamingResponse:
+    return export_response(select(Book.__table__), session_factory, fmt, gzip, "books")
+
+
+@router.get(
+    "/search",
+    response_model=BookPage,
+    dependencies=[admin_user_role_checker],
+)
+async def search_books(
+    search: Annotated[BookSearch, Query()],
+    page: PageParamsDep,
+    fieldset: BookFieldSetDep,
+    session: SessionDep,
+    access_token: AccessTokenDep,
+    service: BookServiceDep,
+    if_none_match: IfNoneMatch = None,
+) -> Response:
+    books, next_cursor = await service.search_books(search, page, fieldset, session)
+    return conditional_json_response(
+        book_page_adapter,
+        {"items": [fieldset.dump(book) for book in books], "next_cursor": next_cursor},
+        if_none_match,
+        exclude_unset=True,
+    )
 
 
 @router.get(
@@ -33,24 +107,44 @@ async def get_books(
 async def get_book(
     book_id: uuid.UUID,
     session: SessionDep,
+    primary_session: PrimarySessionDep,
     access_token: AccessTokenDep,
     service: BookServiceDep,
-) -> Book:
-    return await service.get_book(book_id, session)
+    if_none_match: IfNoneMatch = None,
+) -> Response:
+    if if_none_match is not None and not response_cache.enabled:
+        # Answer revalidations from a cheap version query.
+        etag = make_etag(await service.get_book_version(book_id, session))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    # Cache entries are filled from the primary, which only connects on a miss.
+    fill_session = primary_session if response_cache.enabled else session
+    return cached_json_response(
+        await service.get_book_response(book_id, fill_session), if_none_match
+    )
 
 
 @router.get(
     "/users/{user_id}",
-    response_model=Sequence[BookPublicWithUserAndReviews],
+    response_model=BookPage,
     dependencies=[admin_user_role_checker],
 )
 async def get_user_books(
     user_id: uuid.UUID,
+    page: PageParamsDep,
+    fieldset: BookFieldSetDep,
     session: SessionDep,
     access_token: AccessTokenDep,
     service: BookServiceDep,
-) -> Sequence[Book]:
-    return await service.get_user_books(user_id, session)
+    if_none_match: IfNoneMatch = None,
+) -> Response:
+    books, next_cursor = await service.get_user_books(user_id, page, fieldset, session)
+    return conditional_json_response(
+        book_page_adapter,
+        {"items": [fieldset.dump(book) for book in books], "next_cursor": next_cursor},
+        if_none_match,
+        exclude_unset=True,
+    )
 
 
 @router.post(
@@ -62,12 +156,39 @@ async def get_user_books(
 async def create_book(
     book: BookCreate,
     session: SessionDep,
+    response: Response,
     access_token: AccessTokenDep,
     service: BookServiceDep,
-) -> Book:
-    return await service.create_book(
+) -> Response:
+    created = await service.create_book(
         book, session, user_id=uuid.UUID(access_token.user["user_id"])
     )
+    # Keeps the primary pin cookie get_session sets on `response`.
+    return json_response(book_adapter, created, status.HTTP_201_CREATED, response)
+
+
+@router.post(
+    "/import",
+    response_model=BookImportResult,
+    dependencies=[admin_user_role_checker],
+)
+async def import_books(
+    request: Request,
+    session: SessionDep,
+    access_token: AccessTokenDep,
+    service: BookServiceDep,
+) -> BookImportResult:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if (fmt := CONTENT_TYPES.get(content_type)) is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content type must be one of: {', '.join(CONTENT_TYPES)}.",
+        )
+    return await service.import_books(
+        parse_books(iter_lines(request.stream()), fmt),
+        uuid.UUID(access_token.user["user_id"]),
+        session,
+    )
 
 
 @router.patch(
@@ -79,10 +200,12 @@ async def update_book(
     book_id: uuid.UUID,
     book: BookUpdate,
     session: SessionDep,
+    response: Response,
     access_token: AccessTokenDep,
     service: BookServiceDep,
-) -> Book:
-    return await service.update_book(book_id, book, session)
+) -> Response:
+    updated = await service.update_book(book_id, book, session)
+    return json_response(book_adapter, updated, headers_from=response)
 
 
 @router.delete(
@@ -1,6 +1,7 @@
 from datetime import date
+from enum import Enum
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from src.schemas import Identifier
 
@@ -14,13 +15,35 @@ class BookBase(BaseModel):
     published_date: date
 
 
-class BookUpdate(BookBase): ...
+class BookUpdate(BaseModel):
+    title: str | None = None
+    author: str | None = None
+    publisher: str | None = None
+    page_count: int | None = None
+    language: str | None = None
+    published_date: date | None = None
 
 
 class BookCreate(BookBase): ...
 
 
-class BookPublic(BookBase, Identifier): ...
+class BookPublic(BookBase, Identifier):
+    review_count: int
+    rating_sum: int
+    rating_histogram: list[int]
+    average_rating: float
+
+
+class BookSearch(BaseModel):
+    q: str = Field(min_length=1, max_length=200)
+    language: str | None = None
+    published_from: date | None = None
+    published_to: date | None = None
+
+
+class BookSort(str, Enum):
+    NEWEST = "newest"
+    TOP_RATED = "top_rated"
 
 
 class BookPublicWithUserAndReviews(BookPublic):
@@ -28,6 +51,17 @@ class BookPublicWithUserAndReviews(BookPublic):
     reviews: list["ReviewPublic"] = []
 
 
+class BookImportError(BaseModel):
+    row: int
+    errors: list[str]
+
+
+class BookImportResult(BaseModel):
+    created: int = 0
+    failed: int = 0
+    errors: list[BookImportError] = []
+
+
 from src.auth.schemas import UserPublic  # noqa: E402
 from src.reviews.schemas import ReviewPublic  # noqa: E402
 
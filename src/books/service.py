@@ -1,33 +1,242 @@
+import re
 import uuid
-from collections.abc import Sequence
-from typing import Annotated
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Annotated, Any
 
+import asyncpg
 from fastapi import Depends, HTTPException, status
-from sqlmodel import desc, select
+from pydantic import TypeAdapter
+from sqlalchemy import Float, func, literal, or_
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlmodel import col, delete, select, update
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .models import Book
-from .schemas import BookCreate, BookUpdate
+from src.auth.models import User
+from src.fieldsets import FieldSet
+from src.http_cache import make_etag
+from src.pagination import (
+    Cursor,
+    PageParams,
+    S,
+    encode_cursor,
+    keyset,
+    paginate,
+)
+from src.response_cache import CachedResponse, response_cache
+from src.responses import dump_json
+from src.reviews.models import Review
+
+from .dependencies import BookFilter
+from .importer import IMPORT_CHUNK_SIZE, MAX_REPORTED_ERRORS
+from .models import SEARCH_CONFIG, Book, search_document
+from .schemas import (
+    BookCreate,
+    BookImportError,
+    BookImportResult,
+    BookPublicWithUserAndReviews,
+    BookSearch,
+    BookSort,
+    BookUpdate,
+)
+
+SEARCH_WORD = re.compile(r"\w+")
+
+SORT_KEYS = {BookSort.NEWEST: "created_at", BookSort.TOP_RATED: "average_rating"}
+
+COPY_COLUMNS = (
+    "id",
+    "title",
+    "author",
+    "publisher",
+    "page_count",
+    "language",
+    "published_date",
+    "user_id",
+    "created_at",
+    "updated_at",
+)
+
+
+def search_query(q: str) -> str | None:
+    """Build a tsquery matching all words of `q`, the last one as a prefix."""
+    words = SEARCH_WORD.findall(q.lower())
+    if not words:
+        return None
+    return " & ".join([*words[:-1], f"{words[-1]}:*"])
+
+
+def like_prefix(q: str) -> str:
+    return re.sub(r"([\\%_])", r"\\\1", q) + "%"
+
+
+def load_options(
+    fieldset: FieldSet | None = None, *keys: str
+) -> tuple[LoaderOption, ...]:
+    """Loader options for BookPublicWithUserAndReviews.
+
+    With a fieldset only its columns (plus any `keys` needed for paging) and
+    expanded relationships are loaded.
+    """
+    if fieldset is None:
+        return (joinedload(Book.user), selectinload(Book.reviews))  # type: ignore[arg-type]
+    columns = {*fieldset.fields, *keys}
+    options: list[LoaderOption] = [
+        load_only(*(getattr(Book, name) for name in columns))
+    ]
+    if "user" in fieldset.expand:
+        options.append(joinedload(Book.user))  # type: ignore[arg-type]
+    if "reviews" in fieldset.expand:
+        options.append(selectinload(Book.reviews))  # type: ignore[arg-type]
+    return tuple(options)
+
+
+def filter_books(statement: S, filters: BookFilter) -> S:
+    if filters.author is not None:
+        statement = statement.where(Book.author == filters.author)
+    if filters.language is not None:
+        statement = statement.where(Book.language == filters.language)
+    if filters.min_rating is not None:
+        statement = statement.where(Book.average_rating >= filters.min_rating)
+    if filters.max_rating is not None:
+        statement = statement.where(Book.average_rating <= filters.max_rating)
+    if filters.created_after is not None:
+        statement = statement.where(Book.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        statement = statement.where(Book.created_at < filters.created_before)
+    return statement
+
+
+book_adapter = TypeAdapter(BookPublicWithUserAndReviews)
+
+
+def book_version(book: Book) -> tuple[Any, ...]:
+    """What a BookPublicWithUserAndReviews response depends on, for its ETag."""
+    return (
+        book.id,
+        book.updated_at,
+        book.user.updated_at if book.user is not None else None,
+        max((review.updated_at for review in book.reviews), default=None),
+        len(book.reviews),
+    )
 
 
 class BookService:
-    async def get_books(self, session: AsyncSession) -> Sequence[Book]:
-        result = await session.exec(select(Book).order_by(desc(Book.created_at)))
-        return result.all()
+    async def get_books(
+        self,
+        page: PageParams,
+        sort: BookSort,
+        filters: BookFilter,
+        fieldset: FieldSet,
+        session: AsyncSession,
+    ) -> tuple[Sequence[Book], str | None]:
+        sort_key = SORT_KEYS[sort]
+        return await paginate(
+            filter_books(select(Book), filters).options(
+                *load_options(fieldset, sort_key)
+            ),
+            Book,
+            page,
+            session,
+            sort_key=sort_key,
+        )
+
+    async def search_books(
+        self,
+        search: BookSearch,
+        page: PageParams,
+        fieldset: FieldSet,
+        session: AsyncSession,
+    ) -> tuple[Sequence[Book], str | None]:
+        """Full-text search over title, author and publisher, best match first.
+
+        Titles starting with the query also match, for autocomplete.
+        """
+        title_match = col(Book.title).ilike(like_prefix(search.q))
+        if (query := search_query(search.q)) is None:
+            match, rank = title_match, literal(0.0, Float)
+        else:
+            tsquery = func.to_tsquery(SEARCH_CONFIG, query)
+            match = or_(search_document.bool_op("@@")(tsquery), title_match)
+            rank = func.ts_rank(search_document, tsquery, type_=Float)
+        statement = select(Book, rank).where(match).options(*load_options(fieldset))
+        if search.language is not None:
+            statement = statement.where(Book.language == search.language)
+        if search.published_from is not None:
+            statement = statement.where(Book.published_date >= search.published_from)
+        if search.published_to is not None:
+            statement = statement.where(Book.published_date <= search.published_to)
+        statement = keyset(statement, rank, col(Book.id), page)
+        rows = (await session.exec(statement)).all()
+        books = [book for book, _ in rows[: page.limit]]
+        if len(rows) <= page.limit:
+            return books, None
+        _, last_rank = rows[page.limit - 1]
+        return books, encode_cursor(Cursor(key=last_rank, id=books[-1].id))
 
     async def get_book(self, pk: uuid.UUID, session: AsyncSession) -> Book:
-        result = await session.exec(select(Book).where(Book.id == pk))
+        result = await session.exec(
+            select(Book)
+            .where(Book.id == pk)
+            .options(*load_options())
+            .execution_options(populate_existing=True)
+        )
         if (result := result.first()) is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
         return result
 
-    async def get_user_books(
-        self, user_id: uuid.UUID, session: AsyncSession
-    ) -> Sequence[Book]:
+    async def get_book_response(
+        self, pk: uuid.UUID, session: AsyncSession
+    ) -> CachedResponse:
+        """The serialized book, through the response cache."""
+
+        async def load() -> tuple[CachedResponse, list[str]]:
+            book = await self.get_book(pk, session)
+            response = CachedResponse(
+                etag=make_etag(book_version(book)),
+                body=dump_json(book_adapter, book),
+            )
+            return response, [f"user:{book.user_id}"]
+
+        return await response_cache.get_or_load(f"book:{pk}", [f"book:{pk}"], load)
+
+    async def get_book_version(
+        self, pk: uuid.UUID, session: AsyncSession
+    ) -> tuple[Any, ...]:
+        """book_version() of a book, without loading it or its relationships."""
         result = await session.exec(
-            select(Book).where(Book.user_id == user_id).order_by(desc(Book.created_at))
+            select(
+                Book.id,
+                Book.updated_at,
+                User.updated_at,
+                func.max(Review.updated_at),
+                func.count(col(Review.id)),
+            )
+            .outerjoin(User, col(Book.user_id) == User.id)
+            .outerjoin(Review, col(Review.book_id) == Book.id)
+            .where(Book.id == pk)
+            .group_by(col(Book.id), col(User.updated_at))
+        )
+        if (version := result.first()) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        return tuple(version)
+
+    async def get_user_books(
+        self,
+        user_id: uuid.UUID,
+        page: PageParams,
+        fieldset: FieldSet,
+        session: AsyncSession,
+    ) -> tuple[Sequence[Book], str | None]:
+        return await paginate(
+            select(Book)
+            .where(Book.user_id == user_id)
+            .options(*load_options(fieldset, "created_at")),
+            Book,
+            page,
+            session,
         )
-        return result.all()
 
     async def create_book(
         self, book: BookCreate, session: AsyncSession, user_id: uuid.UUID
@@ -35,22 +244,116 @@ class BookService:
         book_create = Book(**book.model_dump(), user_id=user_id)
         session.add(book_create)
         await session.commit()
-        await session.refresh(book_create, ["reviews"])
-        return book_create
+        return await self.get_book(book_create.id, session)
 
     async def update_book(
         self, book_id: uuid.UUID, book: BookUpdate, session: AsyncSession
     ) -> Book:
-        book_update = await self.get_book(book_id, session)
-        for k, v in book.model_dump().items():
-            setattr(book_update, k, v)
+        statement = (
+            update(Book)
+            .where(Book.id == book_id)  # type: ignore[arg-type]
+            .values(**book.model_dump(exclude_unset=True, exclude_none=True))
+            .returning(Book)
+        )
+        result = await session.exec(
+            select(Book)
+            .from_statement(statement)
+            .options(selectinload(Book.user), selectinload(Book.reviews))  # type: ignore[arg-type]
+            .execution_options(populate_existing=True)
+        )
+        if (book_update := result.scalar_one_or_none()) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
         await session.commit()
+        await response_cache.invalidate(f"book:{book_id}")
         return book_update
 
     async def delete_book(self, book_id: uuid.UUID, session: AsyncSession) -> None:
-        book_delete = await self.get_book(book_id, session)
-        await session.delete(book_delete)
+        # The book's reviews are removed by the ON DELETE CASCADE foreign key.
+        result = await session.exec(
+            delete(Book).where(Book.id == book_id).returning(Book.id)  # type: ignore[arg-type]
+        )
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
         await session.commit()
+        # Cached reviews embedding the book are tagged with it as well.
+        await response_cache.invalidate(f"book:{book_id}")
+
+    async def import_books(
+        self,
+        books: AsyncIterator[tuple[int, BookCreate] | BookImportError],
+        user_id: uuid.UUID,
+        session: AsyncSession,
+    ) -> BookImportResult:
+        result = BookImportResult()
+        chunk: list[tuple[int, BookCreate]] = []
+        async for book in books:
+            if isinstance(book, BookImportError):
+                self._add_import_error(result, book)
+                continue
+            chunk.append(book)
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                await self._copy_books(chunk, user_id, result, session)
+                chunk = []
+        if chunk:
+            await self._copy_books(chunk, user_id, result, session)
+        await session.commit()
+        return result
+
+    async def _copy_books(
+        self,
+        chunk: list[tuple[int, BookCreate]],
+        user_id: uuid.UUID,
+        result: BookImportResult,
+        session: AsyncSession,
+    ) -> None:
+        now = datetime.now()
+        records = [
+            (
+                uuid.uuid4(),
+                book.title,
+                book.author,
+                book.publisher,
+                book.page_count,
+                book.language,
+                book.published_date,
+                user_id,
+                now,
+                now,
+            )
+            for _, book in chunk
+        ]
+        connection = await session.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        try:
+            # A savepoint in the session's transaction, so a failed chunk
+            # doesn't abort the rest of the import.
+            async with session.begin_nested():
+                await driver_connection.copy_records_to_table(
+                    Book.__tablename__, records=records, columns=COPY_COLUMNS
+                )
+        except (asyncpg.PostgresError, asyncpg.DataError, OverflowError) as e:
+            # OverflowError comes from asyncpg itself, for values it can't
+            # encode such as an int too large for the column.
+            if len(chunk) == 1:
+                row, _ = chunk[0]
+                self._add_import_error(
+                    result, BookImportError(row=row, errors=[str(e)])
+                )
+                return
+            # One bad row fails the whole COPY; split the chunk to find which
+            # rows did and still import the others.
+            middle = len(chunk) // 2
+            await self._copy_books(chunk[:middle], user_id, result, session)
+            await self._copy_books(chunk[middle:], user_id, result, session)
+        else:
+            result.created += len(records)
+
+    def _add_import_error(
+        self, result: BookImportResult, error: BookImportError
+    ) -> None:
+        result.failed += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(error)
 
 
 BookServiceDep = Annotated[BookService, Depends(BookService)]
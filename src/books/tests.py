@@ -1,3 +1,4 @@
+import json
 import uuid
 
 import pytest
@@ -5,6 +6,10 @@ import pytest_asyncio
 from fastapi import status
 from httpx import AsyncClient
 
+from src import database
+from src.conftest import async_session
+from src.main import app
+
 BOOK_ENDPOINT_PREFIX = "/api/v1/books"
 
 BOOK_ID = uuid.uuid4()
@@ -25,7 +30,7 @@ async def book_id(
         BOOK_ENDPOINT_PREFIX,
         headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
     )
-    return response.json()[0]["id"]
+    return response.json()["items"][0]["id"]
 
 
 @pytest.mark.asyncio
@@ -65,7 +70,151 @@ async def test_get_books(
     )
     assert response.status_code == status.HTTP_200_OK
     books = response.json()
-    assert isinstance(books, list)
+    assert isinstance(books["items"], list)
+    assert "next_cursor" in books
+
+
+@pytest.mark.asyncio
+async def test_get_books_paginated(
+    test_async_client: AsyncClient, mock_logged_in_user: dict[str, str | dict[str, str]]
+) -> None:
+    headers = {"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"}
+    for title in ("Second Book", "Third Book"):
+        response = await test_async_client.post(
+            BOOK_ENDPOINT_PREFIX,
+            json={
+                "title": title,
+                "author": BOOK_AUTHOR,
+                "publisher": BOOK_PUBLISHER,
+                "published_date": BOOK_PUBLISHED_DATE,
+                "page_count": BOOK_PAGE_COUNT,
+                "language": BOOK_LANGUAGE,
+            },
+            headers=headers,
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    response = await test_async_client.get(
+        BOOK_ENDPOINT_PREFIX, params={"limit": 1}, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert len(first_page["items"]) == 1
+    assert first_page["items"][0]["title"] == "Third Book"
+    assert first_page["next_cursor"] is not None
+
+    response = await test_async_client.get(
+        BOOK_ENDPOINT_PREFIX,
+        params={"limit": 1, "cursor": first_page["next_cursor"]},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    second_page = response.json()
+    assert len(second_page["items"]) == 1
+    assert second_page["items"][0]["title"] == "Second Book"
+
+
+@pytest.mark.asyncio
+async def test_get_books_query_count(
+    test_async_client: AsyncClient,
+    mock_logged_in_user: dict[str, str | dict[str, str]],
+    sql_statements: list[str],
+) -> None:
+    response = await test_async_client.get(
+        BOOK_ENDPOINT_PREFIX,
+        headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["items"]) > 1
+    # The role check's user lookup (unless cached), the books joined with their
+    # users, and one selectin query for all of their reviews.
+    assert len(sql_statements) <= 3, sql_statements
+
+
+@pytest.mark.asyncio
+async def test_get_books_with_invalid_cursor(
+    test_async_client: AsyncClient, mock_logged_in_user: dict[str, str | dict[str, str]]
+) -> None:
+    response = await test_async_client.get(
+        BOOK_ENDPOINT_PREFIX,
+        params={"cursor": "not-a-cursor"},
+        headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor."}
+
+
+@pytest.mark.asyncio
+async def test_get_books_sorted_by_rating(
+    test_async_client: AsyncClient,
+    mock_logged_in_user: dict[str, str | dict[str, str]],
+    book_id: str,
+) -> None:
+    headers = {"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"}
+    for rating in (5, 4):
+        response = await test_async_client.post(
+            f"/api/v1/reviews/books/{book_id}",
+            json={"content": "Great read", "rating": rating},
+            headers=headers,
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    response = await test_async_client.get(
+        BOOK_ENDPOINT_PREFIX, params={"sort": "top_rated"}, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    book = response.json()["items"][0]
+    assert book["id"] == book_id
+    assert book["review_count"] == 2
+    assert book["rating_sum"] == 9
+    assert book["rating_histogram"] == [0, 0, 0, 1, 1]
+    assert book["average_rating"] == 4.5
+
+
+@pytest.mark.asyncio
+async def test_search_books(
+    test_async_client: AsyncClient, mock_logged_in_user: dict[str, str | dict[str, str]]
+) -> None:
+    headers = {"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"}
+    response = await test_async_client.get(
+        f"{BOOK_ENDPOINT_PREFIX}/search", params={"q": "seco"}, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [book["title"] for book in response.json()["items"]] == ["Second Book"]
+
+    response = await test_async_client.get(
+        f"{BOOK_ENDPOINT_PREFIX}/search",
+        params={"q": "book", "language": "French"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["items"] == []
+
+
+@pytest.mark.asyncio
+async def test_get_books_with_filters_and_fields(
+    test_async_client: AsyncClient, mock_logged_in_user: dict[str, str | dict[str, str]]
+) -> None:
+    headers = {"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"}
+    response = await test_async_client.get(
+        BOOK_ENDPOINT_PREFIX,
+        params={"language": BOOK_LANGUAGE, "fields": "title"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    books = response.json()["items"]
+    assert books
+    assert all(set(book) == {"id", "title"} for book in books)
+
+    response = await test_async_client.get(
+        BOOK_ENDPOINT_PREFIX, params={"language": "French"}, headers=headers
+    )
+    assert response.json()["items"] == []
+
+    response = await test_async_client.get(
+        BOOK_ENDPOINT_PREFIX, params={"expand": "owner"}, headers=headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
 
 
 @pytest.mark.asyncio
@@ -83,6 +232,38 @@ async def test_get_book(
     assert book["id"] == book_id
 
 
+@pytest.mark.asyncio
+async def test_get_book_not_modified(
+    test_async_client: AsyncClient,
+    mock_logged_in_user: dict[str, str | dict[str, str]],
+    book_id: str,
+) -> None:
+    headers = {"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"}
+    response = await test_async_client.get(
+        f"{BOOK_ENDPOINT_PREFIX}/{book_id}", headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Vary"] == "Authorization"
+    etag = response.headers["ETag"]
+
+    response = await test_async_client.get(
+        f"{BOOK_ENDPOINT_PREFIX}/{book_id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+
+    await test_async_client.patch(
+        f"{BOOK_ENDPOINT_PREFIX}/{book_id}", json={"page_count": 1}, headers=headers
+    )
+    response = await test_async_client.get(
+        f"{BOOK_ENDPOINT_PREFIX}/{book_id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+
 @pytest.mark.asyncio
 async def test_get_user_books(
     test_async_client: AsyncClient,
@@ -94,7 +275,7 @@ async def test_get_user_books(
     )
     assert response.status_code == status.HTTP_200_OK
     books = response.json()
-    assert isinstance(books, list)
+    assert isinstance(books["items"], list)
 
 
 @pytest.mark.asyncio
@@ -133,3 +314,143 @@ async def test_delete_book(
         headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
     )
     assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.asyncio
+async def test_delete_nonexistent_book(
+    test_async_client: AsyncClient,
+    mock_logged_in_user: dict[str, str | dict[str, str]],
+) -> None:
+    response = await test_async_client.delete(
+        f"{BOOK_ENDPOINT_PREFIX}/{BOOK_ID}",
+        headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_book_writes_pin_reads_to_primary(
+    test_async_client: AsyncClient,
+    mock_logged_in_user: dict[str, str | dict[str, str]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Use the real get_session, which sets the cookie, on the test database.
+    monkeypatch.delitem(app.dependency_overrides, database.get_session)
+    monkeypatch.setattr(database, "async_session", async_session)
+    monkeypatch.setattr(database, "replica_session", async_session)
+    headers = {"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"}
+
+    response = await test_async_client.post(
+        BOOK_ENDPOINT_PREFIX,
+        json={
+            "title": "Pinned Book",
+            "author": BOOK_AUTHOR,
+            "publisher": BOOK_PUBLISHER,
+            "published_date": BOOK_PUBLISHED_DATE,
+            "page_count": BOOK_PAGE_COUNT,
+            "language": BOOK_LANGUAGE,
+        },
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.cookies[database.PRIMARY_PIN_COOKIE] == "1"
+
+    response = await test_async_client.patch(
+        f"{BOOK_ENDPOINT_PREFIX}/{response.json()["id"]}",
+        json={"page_count": 1},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.cookies[database.PRIMARY_PIN_COOKIE] == "1"
+    test_async_client.cookies.clear()
+
+
+@pytest.mark.asyncio
+async def test_import_books(
+    test_async_client: AsyncClient, mock_logged_in_user: dict[str, str | dict[str, str]]
+) -> None:
+    book_data = {
+        "author": BOOK_AUTHOR,
+        "publisher": BOOK_PUBLISHER,
+        "published_date": BOOK_PUBLISHED_DATE,
+        "page_count": BOOK_PAGE_COUNT,
+        "language": BOOK_LANGUAGE,
+    }
+    rows = [
+        {"title": "Imported Book", **book_data},
+        {"title": "Missing Page Count", **book_data, "page_count": None},
+        {"title": "Another Imported Book", **book_data},
+    ]
+    response = await test_async_client.post(
+        f"{BOOK_ENDPOINT_PREFIX}/import",
+        content="\n".join(json.dumps(row) for row in rows),
+        headers={
+            "Authorization": f"Bearer {mock_logged_in_user["access_token"]}",
+            "Content-Type": "application/x-ndjson",
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result["created"] == 2
+    assert result["failed"] == 1
+    assert [error["row"] for error in result["errors"]] == [2]
+
+
+@pytest.mark.asyncio
+async def test_import_books_reports_rows_rejected_by_database(
+    test_async_client: AsyncClient, mock_logged_in_user: dict[str, str | dict[str, str]]
+) -> None:
+    book_data = {
+        "author": BOOK_AUTHOR,
+        "publisher": BOOK_PUBLISHER,
+        "published_date": BOOK_PUBLISHED_DATE,
+        "page_count": BOOK_PAGE_COUNT,
+        "language": BOOK_LANGUAGE,
+    }
+    rows = [
+        {"title": "Imported Book", **book_data},
+        # Valid for the schema, but out of range for the integer column.
+        {"title": "Too Many Pages", **book_data, "page_count": 2**40},
+        {"title": "Another Imported Book", **book_data},
+        {"title": "Null \u0000 Byte", **book_data},
+        {"title": "Last Imported Book", **book_data},
+    ]
+    response = await test_async_client.post(
+        f"{BOOK_ENDPOINT_PREFIX}/import",
+        content="\n".join(json.dumps(row) for row in rows),
+        headers={
+            "Authorization": f"Bearer {mock_logged_in_user["access_token"]}",
+            "Content-Type": "application/x-ndjson",
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result["created"] == 3
+    assert result["failed"] == 2
+    assert [error["row"] for error in result["errors"]] == [2, 4]
+
+
+@pytest.mark.asyncio
+async def test_import_books_with_unsupported_content_type(
+    test_async_client: AsyncClient, mock_logged_in_user: dict[str, str | dict[str, str]]
+) -> None:
+    response = await test_async_client.post(
+        f"{BOOK_ENDPOINT_PREFIX}/import",
+        content="<books/>",
+        headers={
+            "Authorization": f"Bearer {mock_logged_in_user["access_token"]}",
+            "Content-Type": "application/xml",
+        },
+    )
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+
+@pytest.mark.asyncio
+async def test_export_books_requires_admin(
+    test_async_client: AsyncClient, mock_logged_in_user: dict[str, str | dict[str, str]]
+) -> None:
+    response = await test_async_client.get(
+        f"{BOOK_ENDPOINT_PREFIX}/export",
+        headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -1,19 +1,92 @@
-from asgiref.sync import async_to_sync
-from fastapi_mail import MessageSchema, MessageType
+import logging
+import random
+from typing import Any
+
+from celery.signals import worker_process_init, worker_process_shutdown
 from pydantic import EmailStr
 
-from celery import Celery
+from celery import Celery, Task
+
+from .email import (
+    EmailTemplate,
+    build_message,
+    is_transient,
+    load_templates,
+    mailer,
+    render_email,
+)
+
+MAX_RETRIES = 8
+RETRY_BACKOFF = 5  # seconds
+RETRY_BACKOFF_MAX = 600  # seconds
 
-from .email import fm
+logger = logging.getLogger(__name__)
 
 app = Celery()
 
 app.config_from_object("src.config")
 
 
-@app.task()
-def send_email(recipients: list[EmailStr], subject: str, body: str) -> None:
-    message = MessageSchema(
-        recipients=recipients, subject=subject, body=body, subtype=MessageType.html
-    )
-    async_to_sync(fm.send_message)(message)
+def retry_countdown(retries: int) -> float:
+    # Exponential backoff with full jitter, so a provider outage doesn't end
+    # with every queued message retrying at once.
+    return random.uniform(0, min(RETRY_BACKOFF * 2**retries, RETRY_BACKOFF_MAX))
+
+
+@worker_process_init.connect
+def compile_templates(**kwargs: Any) -> None:
+    load_templates()
+
+
+@worker_process_shutdown.connect
+def close_mailer(**kwargs: Any) -> None:
+    mailer.close()
+
+
+def deliver(task: Task, recipients: list[str], subject: str, body: str) -> None:
+    try:
+        mailer.send(build_message(recipients, subject, body))
+    except Exception as e:
+        if not is_transient(e):
+            raise
+        raise task.retry(exc=e, countdown=retry_countdown(task.request.retries))
+
+
+@app.task(bind=True, max_retries=MAX_RETRIES)
+def send_email(self: Task, recipients: list[EmailStr], subject: str, body: str) -> None:
+    deliver(self, recipients, subject, body)
+
+
+@app.task(bind=True, max_retries=MAX_RETRIES)
+def send_template_email(
+    self: Task, recipients: list[EmailStr], template: str, context: dict[str, Any]
+) -> None:
+    """Render one of the email templates in the worker and send it.
+
+    Only the template name and its context go through the broker.
+    """
+    subject, body = render_email(EmailTemplate(template), context)
+    deliver(self, recipients, subject, body)
+
+
+@app.task(bind=True, max_retries=MAX_RETRIES)
+def send_template_emails(self: Task, messages: list[list[Any]]) -> None:
+    """Render and send a batch of send_template_email() argument lists.
+
+    The batch goes out over the worker's SMTP connection in one task. A
+    transient failure retries only the messages not sent yet; messages that
+    fail to render or that the server rejects outright are logged and skipped.
+    """
+    for i, (recipients, template, context) in enumerate(messages):
+        try:
+            subject, body = render_email(EmailTemplate(template), context)
+            mailer.send(build_message(recipients, subject, body))
+        except Exception as e:
+            if not is_transient(e):
+                logger.error("Dropping email to %s", recipients, exc_info=True)
+                continue
+            raise self.retry(
+                args=(messages[i:],),
+                exc=e,
+                countdown=retry_countdown(self.request.retries),
+            )
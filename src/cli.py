@@ -0,0 +1,55 @@
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Annotated
+
+import typer
+
+from src.books.importer import ImportFormat, iter_lines, parse_books
+from src.books.service import BookService
+from src.database import async_session
+
+READ_CHUNK_SIZE = 1 << 16
+
+SUFFIX_FORMATS = {
+    ".csv": ImportFormat.CSV,
+    ".ndjson": ImportFormat.NDJSON,
+    ".jsonl": ImportFormat.NDJSON,
+}
+
+app = typer.Typer()
+
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as file:
+        while chunk := await asyncio.to_thread(file.read, READ_CHUNK_SIZE):
+            yield chunk
+
+
+async def _import_books(path: Path, user_id: uuid.UUID, fmt: ImportFormat) -> None:
+    async with async_session() as session:
+        result = await BookService().import_books(
+            parse_books(iter_lines(read_chunks(path)), fmt), user_id, session
+        )
+    for error in result.errors:
+        typer.echo(f"row {error.row}: {'; '.join(error.errors)}", err=True)
+    typer.echo(f"Imported {result.created} books, {result.failed} failed.")
+
+
+@app.command()
+def import_books(
+    path: Annotated[Path, typer.Argument(exists=True, dir_okay=False)],
+    user_id: Annotated[uuid.UUID, typer.Option()],
+    fmt: Annotated[ImportFormat | None, typer.Option("--format")] = None,
+) -> None:
+    """Bulk import books from an NDJSON or CSV file."""
+    if fmt is None and (fmt := SUFFIX_FORMATS.get(path.suffix.lower())) is None:
+        raise typer.BadParameter(
+            "Can't infer the format from the file name, pass --format."
+        )
+    asyncio.run(_import_books(path, user_id, fmt))
+
+
+if __name__ == "__main__":
+    app()
@@ -1,9 +1,22 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str = ""
     DATABASE_TEST_URL: str = ""
+    DATABASE_REPLICA_URL: str = ""  # reads go to the primary when unset
+    DATABASE_REPLICA_PIN_SECONDS: int = 5
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: int = 30  # seconds
+    DATABASE_POOL_RECYCLE: int = 1800  # seconds
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100
+    DATABASE_STATEMENT_TIMEOUT: int = 0  # milliseconds, 0 disables it
+    # Set when connecting through PgBouncer in transaction pooling mode.
+    DATABASE_PGBOUNCER: bool = False
     JWT_SECRET: str = ""  # generate with `openssl rand -hex 32``
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
@@ -14,7 +27,44 @@ class Settings(BaseSettings):
     MAIL_PASSWORD: str = ""
     MAIL_FROM: str = ""
     MAIL_SERVER: str = ""
+    MAIL_PORT: int = 587
+    MAIL_STARTTLS: bool = True
+    MAIL_SSL_TLS: bool = False
     MAIL_FROM_NAME: str = ""
+    # Messages per second across every worker, 0 disables the limit.
+    MAIL_RATE_LIMIT: int = 10
+    # Reconnect after this many messages; providers cap messages per session.
+    MAIL_MESSAGES_PER_CONNECTION: int = 100
+
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: int = 30  # seconds
+
+    TOKEN_CACHE_SIZE: int = 100_000
+    TOKEN_CACHE_TTL: int = 5  # seconds
+
+    # Sent with ETagged reads, along with Vary: Authorization. "no-cache" lets
+    # caches store them as long as they revalidate; use e.g. "public,
+    # max-age=60" to let a CDN serve them to the same token.
+    HTTP_CACHE_CONTROL: str = "no-cache"
+    RESPONSE_CACHE_TTL: int = 60  # seconds, 0 disables the Redis response cache
+
+    # Requests per minute, 0 disables a limit.
+    RATE_LIMIT_PER_IP: int = 600
+    RATE_LIMIT_PER_USER: int = 600
+    RATE_LIMIT_LOGIN: int = 10  # per IP
+    RATE_LIMIT_SIGNUP: int = 5  # per IP
+    # Requests in flight per process before new ones get a 503.
+    LOAD_SHED_MAX_CONCURRENT: int = 200
+    # Database pool usage (see db_pool_saturation_ratio) that sheds requests.
+    LOAD_SHED_POOL_SATURATION: float = 0.9
+
+    # Celery tasks waiting to be published before handlers get a 503.
+    TASK_QUEUE_SIZE: int = 1000
 
     DOMAIN: str = ""
     TESTING: bool = False
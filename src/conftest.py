@@ -1,17 +1,19 @@
 import asyncio
 from collections.abc import AsyncGenerator, Generator
+from typing import Any
 
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .auth.tests import AUTH_ENDPOINT_PREFIX, MOCK_USER_EMAIL, MOCK_USER_PASSWORD
 from .config import Config
-from .database import get_session
+from .database import get_primary_session, get_session, get_session_factory
 from .main import app
 
 async_engine = create_async_engine(url=Config.DATABASE_TEST_URL)
@@ -47,10 +49,24 @@ def event_loop() -> Generator[asyncio.AbstractEventLoop]:
 @pytest_asyncio.fixture(scope="session", autouse=False)
 async def test_async_client() -> AsyncGenerator[AsyncClient, None]:
     app.dependency_overrides[get_session] = get_test_session
+    app.dependency_overrides[get_primary_session] = get_test_session
+    app.dependency_overrides[get_session_factory] = lambda: async_session
     async with AsyncClient(app=app, base_url="http://test") as client:
         yield client
 
 
+@pytest.fixture
+def sql_statements() -> Generator[list[str]]:
+    statements: list[str] = []
+
+    def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
 @pytest.fixture
 def test_sync_client() -> TestClient:
     return TestClient(app)
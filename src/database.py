@@ -1,19 +1,97 @@
+import time
+import uuid
 from collections.abc import AsyncGenerator
-from typing import Annotated
+from typing import Annotated, Any
 
-from fastapi import Depends
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi import Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from .cache import TTLCache
 from .config import Config
+from .metrics import DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_SECONDS, DB_POOL_SATURATION
 
-async_engine = create_async_engine(url=Config.DATABASE_URL)
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(self.logging_name).observe(
+                time.perf_counter() - start
+            )
+
+
+def create_engine(url: str, name: str) -> AsyncEngine:
+    connect_args: dict[str, Any] = {
+        "prepared_statement_cache_size": Config.DATABASE_STATEMENT_CACHE_SIZE,
+    }
+    if Config.DATABASE_STATEMENT_TIMEOUT:
+        connect_args["server_settings"] = {
+            "statement_timeout": str(Config.DATABASE_STATEMENT_TIMEOUT)
+        }
+    if Config.DATABASE_PGBOUNCER:
+        # PgBouncer may run each transaction on a different server connection,
+        # so prepared statements can't be cached and their names must not clash.
+        connect_args |= {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    engine = create_async_engine(
+        url=url,
+        poolclass=InstrumentedPool,
+        pool_size=Config.DATABASE_POOL_SIZE,
+        max_overflow=Config.DATABASE_MAX_OVERFLOW,
+        pool_timeout=Config.DATABASE_POOL_TIMEOUT,
+        pool_recycle=Config.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=Config.DATABASE_POOL_PRE_PING,
+        pool_logging_name=name,
+        connect_args=connect_args,
+    )
+    DB_POOL_CHECKED_OUT.labels(name).set_function(
+        lambda: engine.pool.checkedout()  # type: ignore[attr-defined]
+    )
+    DB_POOL_SATURATION.labels(name).set_function(lambda: pool_saturation(engine))
+    return engine
+
+
+def pool_saturation(engine: AsyncEngine) -> float:
+    """Checked out connections divided by pool_size + max_overflow."""
+    capacity = Config.DATABASE_POOL_SIZE + Config.DATABASE_MAX_OVERFLOW
+    return engine.pool.checkedout() / capacity  # type: ignore[attr-defined]
+
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+PRIMARY_PIN_COOKIE = "db_primary_pin"
+
+async_engine = create_engine(Config.DATABASE_URL, "primary")
 async_session = async_sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
+if Config.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(Config.DATABASE_REPLICA_URL, "replica")
+    # Standbys only serve reads, mark the sessions read-only to match.
+    replica_session = async_sessionmaker(
+        bind=replica_engine.execution_options(postgresql_readonly=True),
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+else:
+    # Without a replica, reads share the primary's engine and sessions as is.
+    replica_engine = async_engine
+    replica_session = async_session
+# Authenticated clients are also pinned by their token, for those that ignore
+# cookies or whose response dropped it. This is per process, so across several
+# workers only the cookie keeps a client's reads on the primary.
+primary_pins = TTLCache[str, bool](
+    maxsize=100_000, ttl=Config.DATABASE_REPLICA_PIN_SECONDS
+)
 
 
 async def init_db() -> None:
@@ -26,9 +104,45 @@ async def drop_db() -> None:
         await conn.run_sync(SQLModel.metadata.drop_all)
 
 
-async def get_session() -> AsyncGenerator[AsyncSession]:
+async def get_session(
+    request: Request, response: Response
+) -> AsyncGenerator[AsyncSession]:
+    token = request.headers.get("authorization")
+    if request.method not in SAFE_METHODS:
+        # Keep this client's reads on the primary until the replica has had
+        # time to replay the write.
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE,
+            "1",
+            max_age=Config.DATABASE_REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+        if token:
+            primary_pins.set(token, True)
+        session_factory = async_session
+    elif PRIMARY_PIN_COOKIE in request.cookies or (token and primary_pins.get(token)):
+        session_factory = async_session
+    else:
+        session_factory = replica_session
+    async with session_factory() as session:
+        yield session
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    # For streamed responses, whose body is sent after the request's session
+    # dependency has been closed.
+    return replica_session
+
+
+async def get_primary_session() -> AsyncGenerator[AsyncSession]:
     async with async_session() as session:
         yield session
 
 
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
+# For the few safe-method handlers that still write.
+PrimarySessionDep = Annotated[AsyncSession, Depends(get_primary_session)]
+SessionFactoryDep = Annotated[
+    async_sessionmaker[AsyncSession], Depends(get_session_factory)
+]
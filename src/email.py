@@ -1,25 +1,174 @@
-from fastapi_mail import ConnectionConfig, FastMail
+import logging
+import smtplib
+import ssl
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template
 from pydantic import BaseModel, EmailStr
+from redis import Redis
+from redis.exceptions import RedisError
 
 from src.config import Config
 
+SMTP_TIMEOUT = 30  # seconds
+RATE_LIMIT_PREFIX = "email-rate:"
+TEMPLATES_DIR = Path(__file__).parent / "templates" / "email"
+
+logger = logging.getLogger(__name__)
+
 
 class Email(BaseModel):
     emails: list[EmailStr]
 
 
-mail_config = ConnectionConfig(
-    MAIL_USERNAME=Config.MAIL_USERNAME,
-    MAIL_PASSWORD=Config.MAIL_PASSWORD,
-    MAIL_FROM=Config.MAIL_FROM,
-    MAIL_PORT=587,
-    MAIL_SERVER=Config.MAIL_SERVER,
-    MAIL_FROM_NAME=Config.MAIL_FROM_NAME,
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
+class EmailTemplate(str, Enum):
+    VERIFY_EMAIL = "verify_email"
+    RESET_PASSWORD = "reset_password"
+
+
+SUBJECTS = {
+    EmailTemplate.VERIFY_EMAIL: "Verify your email",
+    EmailTemplate.RESET_PASSWORD: "Verify your password",
+}
+
+templates_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=True,
+    undefined=StrictUndefined,
+    # Templates are compiled once by load_templates, don't stat them per render.
+    auto_reload=False,
 )
+templates_env.globals["domain"] = Config.DOMAIN
+_templates: dict[EmailTemplate, Template] = {}
+
+
+def load_templates() -> None:
+    """Compile every email template, e.g. when a worker process starts."""
+    for template in EmailTemplate:
+        _templates[template] = templates_env.get_template(f"{template.value}.html")
+
+
+def render_email(template: EmailTemplate, context: dict[str, Any]) -> tuple[str, str]:
+    """The subject and HTML body of `template` rendered with `context`."""
+    if template not in _templates:
+        load_templates()
+    return SUBJECTS[template], _templates[template].render(context)
+
+
+def build_message(recipients: list[str], subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((Config.MAIL_FROM_NAME, Config.MAIL_FROM))
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(body, subtype="html")
+    return message
 
 
-fm = FastMail(config=mail_config)
+def is_transient(error: Exception) -> bool:
+    """Whether sending again later may succeed.
+
+    4xx replies (too many connections, quota exceeded, greylisting) and
+    dropped connections are retried, 5xx replies are not.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, smtplib.SMTPException | OSError)
+
+
+class Mailer:
+    """An SMTP connection kept open across the tasks of a worker process.
+
+    The connection is opened on first use and replaced after `max_messages`
+    messages or when the server drops it, so consecutive messages share one
+    handshake. Sending is throttled to `rate_limit` messages per second across
+    every worker through a counter in Redis.
+    """
+
+    def __init__(self, redis: Redis, rate_limit: int, max_messages: int) -> None:
+        self.redis = redis
+        self.rate_limit = rate_limit
+        self.max_messages = max_messages
+        self._smtp: smtplib.SMTP | None = None
+        self._sent = 0
+
+    def send(self, message: EmailMessage) -> None:
+        self._throttle()
+        smtp = self._connection()
+        try:
+            smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Servers close idle connections, try once more on a new one.
+            self.close()
+            self._connection().send_message(message)
+        self._sent += 1
+        if self._sent >= self.max_messages:
+            self.close()
+
+    def close(self) -> None:
+        if self._smtp is None:
+            return
+        smtp, self._smtp, self._sent = self._smtp, None, 0
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            return self._smtp
+        context = ssl.create_default_context()
+        if Config.MAIL_SSL_TLS:
+            smtp: smtplib.SMTP = smtplib.SMTP_SSL(
+                Config.MAIL_SERVER,
+                Config.MAIL_PORT,
+                timeout=SMTP_TIMEOUT,
+                context=context,
+            )
+        else:
+            smtp = smtplib.SMTP(
+                Config.MAIL_SERVER, Config.MAIL_PORT, timeout=SMTP_TIMEOUT
+            )
+        try:
+            if Config.MAIL_STARTTLS and not Config.MAIL_SSL_TLS:
+                smtp.starttls(context=context)
+            if Config.MAIL_USERNAME:
+                smtp.login(Config.MAIL_USERNAME, Config.MAIL_PASSWORD)
+        except BaseException:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        return smtp
+
+    def _throttle(self) -> None:
+        if self.rate_limit <= 0:
+            return
+        while True:
+            window = int(time.time())
+            key = f"{RATE_LIMIT_PREFIX}{window}"
+            try:
+                with self.redis.pipeline(transaction=False) as pipe:
+                    count, _ = pipe.incr(key).expire(key, 2).execute()
+            except RedisError:
+                logger.warning("Email rate limit check failed", exc_info=True)
+                return
+            if count <= self.rate_limit:
+                return
+            time.sleep(max(window + 1 - time.time(), 0))
+
+
+mailer = Mailer(
+    Redis(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        password=Config.REDIS_PASSWORD,
+    ),
+    rate_limit=Config.MAIL_RATE_LIMIT,
+    max_messages=Config.MAIL_MESSAGES_PER_CONNECTION,
+)
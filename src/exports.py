@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import uuid
+import zlib
+from collections.abc import AsyncIterator, Sequence
+from datetime import date
+from enum import Enum
+from typing import Any
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import RowMapping, Select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Can't export {type(value).__name__} values.")
+
+
+def _encode_ndjson(rows: Sequence[RowMapping]) -> str:
+    return "".join(json.dumps(dict(row), default=_json_default) + "\n" for row in rows)
+
+
+def _encode_csv(rows: Sequence[RowMapping], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(rows[0].keys())
+    writer.writerows(row.values() for row in rows)
+    return buffer.getvalue()
+
+
+async def _export_rows(
+    statement: Select[Any],
+    session_factory: async_sessionmaker[AsyncSession],
+    fmt: ExportFormat,
+) -> AsyncIterator[bytes]:
+    # The request's session is closed by the time the body is streamed, so
+    # the export opens its own. yield_per makes this a server-side cursor.
+    async with session_factory() as session:
+        result = await session.stream(
+            statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        first = True
+        async for rows in result.mappings().partitions():
+            if fmt is ExportFormat.NDJSON:
+                yield _encode_ndjson(rows).encode()
+            else:
+                yield _encode_csv(rows, header=first).encode()
+            first = False
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+
+def export_response(
+    statement: Select[Any],
+    session_factory: async_sessionmaker[AsyncSession],
+    fmt: ExportFormat,
+    compress: bool,
+    name: str,
+) -> StreamingResponse:
+    """Stream the rows of a Core `statement` as an NDJSON or CSV download."""
+    body = _export_rows(statement, session_factory, fmt)
+    filename = f"{name}.{fmt.value}"
+    media_type = MEDIA_TYPES[fmt]
+    if compress:
+        body, filename, media_type = _gzip(body), f"{filename}.gz", "application/gzip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
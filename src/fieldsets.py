@@ -0,0 +1,57 @@
+from collections.abc import Callable, Collection
+from dataclasses import dataclass
+from typing import Annotated, Any
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+
+
+@dataclass(frozen=True)
+class FieldSet:
+    # Scalar fields to return, always including "id".
+    fields: tuple[str, ...]
+    # Relationships to load and return.
+    expand: frozenset[str]
+
+    def dump(self, obj: Any) -> dict[str, Any]:
+        """Pick the selected attributes off an ORM object for the response."""
+        return {name: getattr(obj, name) for name in (*self.fields, *self.expand)}
+
+
+def _parse_names(value: str | None, allowed: Collection[str], param: str) -> list[str]:
+    names = [name.strip() for name in (value or "").split(",") if name.strip()]
+    if unknown := [name for name in names if name not in allowed]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {param}: {', '.join(unknown)}.",
+        )
+    return names
+
+
+def fieldset_dependency(
+    model: type[BaseModel], relationships: Collection[str]
+) -> Callable[..., FieldSet]:
+    """Build a dependency reading `fields` and `expand` for responses of `model`.
+
+    `fields` takes comma separated field or relationship names and `expand`
+    relationship names. Without either, every field is returned and every
+    relationship expanded.
+    """
+    scalars = tuple(name for name in model.model_fields if name not in relationships)
+
+    def get_fieldset(
+        fields: Annotated[str | None, Query()] = None,
+        expand: Annotated[str | None, Query()] = None,
+    ) -> FieldSet:
+        if fields is None and expand is None:
+            return FieldSet(fields=scalars, expand=frozenset(relationships))
+        expanded = set(_parse_names(expand, relationships, "expand"))
+        if fields is None:
+            return FieldSet(fields=scalars, expand=frozenset(expanded))
+        selected = set(_parse_names(fields, (*scalars, *relationships), "fields"))
+        return FieldSet(
+            fields=tuple(name for name in scalars if name == "id" or name in selected),
+            expand=frozenset(expanded | (selected & set(relationships))),
+        )
+
+    return get_fieldset
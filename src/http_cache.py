@@ -0,0 +1,64 @@
+import hashlib
+from typing import Annotated, Any
+
+from fastapi import Header, Response, status
+from pydantic import TypeAdapter
+
+from .config import Config
+from .response_cache import CachedResponse
+from .responses import dump_json
+
+IfNoneMatch = Annotated[str | None, Header()]
+
+
+def make_etag(version: Any) -> str:
+    """Strong ETag for a value's repr, e.g. a tuple of updated_at columns."""
+    return f'"{hashlib.sha256(repr(version).encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison.
+    tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in tags
+
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = Config.HTTP_CACHE_CONTROL
+    # These reads need a token, so a shared cache must not serve one client's
+    # response to another, even with a "public" Cache-Control.
+    response.headers["Vary"] = "Authorization"
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag)
+    return response
+
+
+def conditional_json_response(
+    adapter: TypeAdapter[Any],
+    content: Any,
+    if_none_match: str | None,
+    exclude_unset: bool = False,
+) -> Response:
+    """Serialize `content` and answer 304 if the client already has the body.
+
+    For responses with no cheap version to compare, the ETag is a hash of the
+    JSON body itself.
+    """
+    body = dump_json(adapter, content, exclude_unset=exclude_unset)
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    return cached_json_response(CachedResponse(etag=etag, body=body), if_none_match)
+
+
+def cached_json_response(cached: CachedResponse, if_none_match: str | None) -> Response:
+    if etag_matches(if_none_match, cached.etag):
+        return not_modified(cached.etag)
+    response = Response(content=cached.body, media_type="application/json")
+    set_cache_headers(response, cached.etag)
+    return response
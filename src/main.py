@@ -1,31 +1,48 @@
+import asyncio
+import contextlib
 from collections.abc import AsyncGenerator
 
 from fastapi import FastAPI
 from fastapi.concurrency import asynccontextmanager
+from fastapi.responses import ORJSONResponse
 
+from .auth.hashing import password_hasher
+from .auth.redis import blocklist_checker
 from .auth.router import router as auth_router
 from .books.router import router as book_router
-from .database import init_db
+from .metrics import metrics_app
 from .middlewares import register_middlewares
 from .reviews.router import router as review_router
+from .tasks import dispatcher
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
     print("server starting...")
-    await init_db()
+    # Subscribe before serving so no revocation is missed, unless Redis is
+    # down; the schema itself is managed by the migrations.
+    blocklist_checker.start()
+    with contextlib.suppress(TimeoutError):
+        await asyncio.wait_for(blocklist_checker.subscribed.wait(), 5)
     yield
+    await blocklist_checker.stop()
+    password_hasher.shutdown()
+    dispatcher.shutdown()
     print("server stopped")
 
 
 version = "v1"
 app = FastAPI(
-    version=version, description="RESTful API for a book review web service."
-)  # lifespan=lifespan
+    version=version,
+    description="RESTful API for a book review web service.",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 register_middlewares(app)
 app.include_router(auth_router, prefix=f"/api/{version}/auth", tags=["auth"])
 app.include_router(book_router, prefix=f"/api/{version}/books", tags=["books"])
 app.include_router(review_router, prefix=f"/api/{version}/reviews", tags=["reviews"])
+app.mount("/metrics", metrics_app)
 
 
 @app.get("/")
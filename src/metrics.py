@@ -0,0 +1,54 @@
+from prometheus_client import Counter, Gauge, Histogram, make_asgi_app
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting to check a connection out of the database pool.",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the database pool.",
+    ["pool"],
+)
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation_ratio",
+    "Checked out connections divided by pool_size + max_overflow.",
+    ["pool"],
+)
+TASK_DISPATCH_QUEUE_DEPTH = Gauge(
+    "task_dispatch_queue_depth",
+    "Celery tasks waiting for the publisher thread.",
+)
+TASKS_DISPATCHED = Counter(
+    "task_dispatch_published_total", "Celery tasks published to the broker."
+)
+TASKS_RETRIED = Counter(
+    "task_dispatch_retried_total",
+    "Celery tasks kept to be published again after a broker error.",
+)
+TASKS_DROPPED = Counter(
+    "task_dispatch_dropped_total",
+    "Celery tasks that could not be published, or still unpublished at shutdown.",
+)
+TASKS_REJECTED = Counter(
+    "task_dispatch_rejected_total",
+    "Celery tasks rejected because the dispatch queue was full.",
+)
+TASK_PUBLISH_SECONDS = Histogram(
+    "task_publish_batch_seconds",
+    "Time spent publishing one batch of Celery tasks.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS_RATE_LIMITED = Counter(
+    "http_requests_rate_limited_total",
+    "Requests rejected with a 429, by the budget they exceeded.",
+    ["budget"],
+)
+REQUESTS_SHED = Counter(
+    "http_requests_shed_total",
+    "Requests rejected with a 503 by the load shedder.",
+    ["reason"],
+)
+
+metrics_app = make_asgi_app()
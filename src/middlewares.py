@@ -1,11 +1,89 @@
-from fastapi import FastAPI
+import math
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from .config import Config
+from .database import async_engine, pool_saturation, replica_engine
+from .metrics import REQUESTS_SHED
+from .rate_limit import RateLimiter, rate_limiter, request_budgets
+
+# Left out of load shedding so monitoring keeps working under load.
+UNSHED_PATHS = ("/metrics",)
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, limiter: RateLimiter) -> None:
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if wait := await self.limiter.check(request_budgets(Request(scope))):
+            response = ORJSONResponse(
+                {"detail": "Too many requests."},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+
+class LoadShedMiddleware:
+    """Rejects requests with a 503 before the process is overloaded.
+
+    Requests are shed while `max_concurrent` are already in flight, or while
+    a database pool is at least `max_pool_saturation` checked out, since new
+    requests would only queue for a connection and time out.
+    """
+
+    def __init__(
+        self, app: ASGIApp, max_concurrent: int, max_pool_saturation: float
+    ) -> None:
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.max_pool_saturation = max_pool_saturation
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(UNSHED_PATHS):
+            return await self.app(scope, receive, send)
+        if (reason := self._overload()) is not None:
+            REQUESTS_SHED.labels(reason).inc()
+            response = ORJSONResponse(
+                {"detail": "Server is busy, please retry later."},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+            return await response(scope, receive, send)
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    def _overload(self) -> str | None:
+        if self.in_flight >= self.max_concurrent:
+            return "concurrency"
+        saturation = max(pool_saturation(async_engine), pool_saturation(replica_engine))
+        if saturation >= self.max_pool_saturation:
+            return "db_pool"
+        return None
 
 
 def register_middlewares(app: FastAPI) -> None:
+    if not Config.TESTING:
+        # Added before CORS so that rejections still carry CORS headers.
+        app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+        app.add_middleware(
+            LoadShedMiddleware,
+            max_concurrent=Config.LOAD_SHED_MAX_CONCURRENT,
+            max_pool_saturation=Config.LOAD_SHED_POOL_SATURATION,
+        )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
+
+import sqlalchemy.dialects.postgresql as pg
+from sqlalchemy import BigInteger, Identity, func
+from sqlmodel import Column, Field, SQLModel, col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .celery import app as celery_app
+from .celery import send_template_email, send_template_emails
+from .database import async_engine, async_session
+
+CHANNEL = "outbox"
+RELAY_BATCH_SIZE = 100
+# Polled as well in case a notification is missed, e.g. while reconnecting.
+RELAY_POLL_SECONDS = 5
+# Tasks whose messages are published together as one task of another kind,
+# which takes the list of their argument lists.
+BATCH_TASKS = {send_template_email.name: send_template_emails.name}
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxMessage(SQLModel, table=True):
+    __tablename__ = "outbox"  # type: ignore[reportAssignmentType]
+
+    id: int | None = Field(
+        default=None, sa_column=Column(BigInteger, Identity(), primary_key=True)
+    )
+    task: str
+    args: list[Any] = Field(sa_column=Column(pg.JSONB, nullable=False))
+    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+
+
+async def add_outbox_message(session: AsyncSession, task: str, *args: Any) -> None:
+    """Queue Celery `task` to be sent with `args` once `session` commits.
+
+    The NOTIFY that wakes the relay is also only delivered on commit.
+    """
+    session.add(OutboxMessage(task=task, args=list(args)))
+    await session.exec(select(func.pg_notify(CHANNEL, "")))
+
+
+def _publish(messages: Sequence[OutboxMessage]) -> None:
+    tasks: list[tuple[str, list[Any]]] = []
+    batches: dict[str, list[Any]] = defaultdict(list)
+    for message in messages:
+        if (batch_task := BATCH_TASKS.get(message.task)) is not None:
+            batches[batch_task].append(message.args)
+        else:
+            tasks.append((message.task, message.args))
+    tasks += [(task, [batch]) for task, batch in batches.items()]
+    with celery_app.producer_or_acquire() as producer:
+        for task, args in tasks:
+            # Nothing waits on the result, don't subscribe to it.
+            celery_app.send_task(task, args=args, producer=producer, ignore_result=True)
+
+
+async def relay_batch() -> int:
+    """Publish and delete the oldest outbox messages, returning how many.
+
+    Messages stay locked until they are deleted, so several relays can run.
+    A crash between publishing and committing publishes them again: delivery
+    is at least once. Template emails go out as one task, which sends them
+    over a single SMTP connection.
+    """
+    async with async_session() as session, session.begin():
+        messages = (
+            await session.exec(
+                select(OutboxMessage)
+                .order_by(col(OutboxMessage.id))
+                .limit(RELAY_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+        if not messages:
+            return 0
+        # Publishing blocks on the broker, keep it off the event loop.
+        await asyncio.to_thread(_publish, messages)
+        await session.exec(
+            delete(OutboxMessage).where(
+                col(OutboxMessage.id).in_([message.id for message in messages])
+            )
+        )
+    return len(messages)
+
+
+async def relay() -> None:
+    """Publish outbox messages as they are committed.
+
+    Tasks are written to the outbox in the transaction that made them
+    necessary, so requests never wait on the broker and a broker outage
+    can't lose them. Run with `python -m src.outbox`.
+    """
+    wake = asyncio.Event()
+    async with async_engine.connect() as conn:
+        # LISTEN needs a session-level connection, so with PgBouncer in
+        # transaction mode the relay falls back to polling.
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.add_listener(  # type: ignore[union-attr]
+            CHANNEL, lambda *args: wake.set()
+        )
+        while True:
+            wake.clear()
+            try:
+                while await relay_batch() == RELAY_BATCH_SIZE:
+                    pass
+            except Exception:
+                logger.exception("Outbox relay failed, retrying")
+            try:
+                await asyncio.wait_for(wake.wait(), RELAY_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(relay())
@@ -0,0 +1,112 @@
+import base64
+import json
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Annotated, Any, Protocol, TypeVar
+
+from fastapi import Depends, HTTPException, Query, status
+from sqlalchemy import ColumnElement, Select
+from sqlmodel import col, desc, tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+class Keyed(Protocol):
+    id: uuid.UUID
+    created_at: datetime
+
+
+T = TypeVar("T", bound=Keyed)
+S = TypeVar("S", bound=Select[Any])
+
+
+@dataclass
+class Cursor:
+    # The sort key value of the last row, as it was serialized to JSON.
+    key: Any
+    id: uuid.UUID
+
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+    )
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    key = cursor.key.isoformat() if isinstance(cursor.key, datetime) else cursor.key
+    payload = {"key": key, "id": str(cursor.id)}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(token: str) -> Cursor:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return Cursor(key=payload["key"], id=uuid.UUID(payload["id"]))
+    except (ValueError, KeyError, TypeError):
+        raise invalid_cursor()
+
+
+def cursor_key(column: ColumnElement[Any], key: Any) -> Any:
+    """Convert a cursor's JSON key back to the Python type of `column`."""
+    python_type = column.type.python_type
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(key)
+        return python_type(key)
+    except (ValueError, TypeError):
+        raise invalid_cursor()
+
+
+@dataclass
+class PageParams:
+    cursor: Cursor | None
+    limit: int
+
+
+def get_page_params(
+    cursor: Annotated[str | None, Query()] = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+) -> PageParams:
+    return PageParams(cursor=decode_cursor(cursor) if cursor else None, limit=limit)
+
+
+PageParamsDep = Annotated[PageParams, Depends(get_page_params)]
+
+
+def keyset(
+    statement: S, key: ColumnElement[Any], pk: ColumnElement[Any], page: PageParams
+) -> S:
+    """Order `statement` by (key, pk) descending and start it after the cursor.
+
+    One extra row is fetched to tell whether a next page exists.
+    """
+    if page.cursor is not None:
+        statement = statement.where(
+            tuple_(key, pk) < tuple_(cursor_key(key, page.cursor.key), page.cursor.id)
+        )
+    return statement.order_by(desc(key), desc(pk)).limit(page.limit + 1)
+
+
+async def paginate(
+    statement: SelectOfScalar[T],
+    model: type[T],
+    page: PageParams,
+    session: AsyncSession,
+    sort_key: str = "created_at",
+) -> tuple[Sequence[T], str | None]:
+    """Fetch one page of `statement` in descending order of (sort_key, id).
+
+    `sort_key` must be a non-nullable column of `model`.
+    """
+    statement = keyset(statement, col(getattr(model, sort_key)), col(model.id), page)
+    rows = (await session.exec(statement)).all()
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[: page.limit]
+    return rows, encode_cursor(Cursor(key=getattr(rows[-1], sort_key), id=rows[-1].id))
@@ -0,0 +1,141 @@
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import jwt
+from fastapi import Request
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.cache import TTLCache
+from src.config import Config
+from src.metrics import REQUESTS_RATE_LIMITED
+
+KEY_PREFIX = "rate:"
+
+logger = logging.getLogger(__name__)
+
+# Takes a token from every bucket or from none of them. Buckets hold up to
+# their capacity and refill continuously. Returns {0} when allowed, else the
+# milliseconds until the emptiest bucket has a token and that bucket's index.
+TAKE = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local levels = {}
+local wait, denied = 0, 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i]) / 1000
+    local bucket = redis.call("HMGET", key, "tokens", "ts")
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+    if tokens < 1 and math.ceil((1 - tokens) / rate) > wait then
+        wait, denied = math.ceil((1 - tokens) / rate), i
+    end
+    levels[i] = tokens
+end
+if wait > 0 then
+    return {wait, denied}
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i]) / 1000
+    redis.call("HSET", key, "tokens", tostring(levels[i] - 1), "ts", now)
+    redis.call("PEXPIRE", key, math.ceil(capacity / rate))
+end
+return {0}
+"""
+
+
+@dataclass(frozen=True)
+class Budget:
+    # What the budget is counted by, e.g. "ip" or "user".
+    kind: str
+    key: str
+    # Requests per minute, also the largest burst.
+    limit: int
+
+    @property
+    def rate(self) -> float:
+        return self.limit / 60
+
+
+class RateLimiter:
+    """Token bucket rate limits kept in Redis, one script call per request.
+
+    A request takes a token from each of its budgets, or from none of them if
+    any is empty. A budget found empty is remembered locally until it has
+    tokens again, so clients over their limit are turned away without a
+    Redis round trip. Redis errors let requests through.
+    """
+
+    def __init__(self, redis: Redis, blocked: TTLCache[str, float]) -> None:
+        self.redis = redis
+        self.blocked = blocked
+        self._take = redis.register_script(TAKE)
+
+    async def check(self, budgets: Sequence[Budget]) -> float:
+        """Take a token from every budget, returning 0 or seconds to wait."""
+        budgets = [budget for budget in budgets if budget.limit > 0]
+        if not budgets:
+            return 0
+        for budget in budgets:
+            if (until := self.blocked.get(budget.key)) is not None:
+                REQUESTS_RATE_LIMITED.labels(budget.kind).inc()
+                return max(until - time.monotonic(), 0)
+        args: list[float] = []
+        for budget in budgets:
+            args += [budget.limit, budget.rate]
+        try:
+            wait_ms, *denied = await self._take(
+                keys=[KEY_PREFIX + budget.key for budget in budgets], args=args
+            )
+        except RedisError:
+            logger.warning("Rate limit check failed", exc_info=True)
+            return 0
+        if not wait_ms:
+            return 0
+        budget, wait = budgets[denied[0] - 1], wait_ms / 1000
+        self.blocked.set(budget.key, time.monotonic() + wait, ttl=wait)
+        REQUESTS_RATE_LIMITED.labels(budget.kind).inc()
+        return wait
+
+
+# Stricter per-client budgets for the expensive, abuse-prone endpoints.
+ROUTE_LIMITS = {
+    "/api/v1/auth/login": Config.RATE_LIMIT_LOGIN,
+    "/api/v1/auth/signup": Config.RATE_LIMIT_SIGNUP,
+}
+
+
+def _user_id(request: Request) -> str | None:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, key=Config.JWT_SECRET, algorithms=["HS256"])
+        return str(payload["user"]["user_id"])
+    except (jwt.PyJWTError, KeyError, TypeError):
+        return None
+
+
+def request_budgets(request: Request) -> list[Budget]:
+    ip = request.client.host if request.client else "unknown"
+    budgets = [Budget("ip", f"ip:{ip}", Config.RATE_LIMIT_PER_IP)]
+    if (user_id := _user_id(request)) is not None:
+        budgets.append(Budget("user", f"user:{user_id}", Config.RATE_LIMIT_PER_USER))
+    if (limit := ROUTE_LIMITS.get(request.url.path)) is not None:
+        budgets.append(Budget("route", f"route:{request.url.path}:{ip}", limit))
+    return budgets
+
+
+rate_limiter = RateLimiter(
+    Redis(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        password=Config.REDIS_PASSWORD,
+    ),
+    TTLCache[str, float](maxsize=100_000, ttl=60),
+)
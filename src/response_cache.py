@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "response:"
+LOCK_PREFIX = "response-lock:"
+GENERATION_PREFIX = "response-tag:"
+INVALIDATED_PREFIX = "response-tag-invalidated:"
+FILL_LOCK_MS = 5000
+FILL_WAIT_SECONDS = 0.05
+FILL_WAIT_ATTEMPTS = 20
+
+# Return the entry only if every tag it was built under is still at the same
+# generation, so a hit costs one round trip.
+GET_FRESH = """
+local entry = redis.call("GET", KEYS[1])
+if not entry then
+    return false
+end
+local newline = string.find(entry, "\\n", 1, true)
+local header = cjson.decode(string.sub(entry, 1, newline - 1))
+for tag, generation in pairs(header.tags) do
+    if (redis.call("GET", ARGV[1] .. tag) or "0") ~= generation then
+        return false
+    end
+end
+return entry
+"""
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    etag: str
+    body: bytes
+
+
+# A loader returns the response plus any tags it turned out to depend on
+# beyond the ones known before loading.
+Loader = Callable[[], Awaitable[tuple[CachedResponse, Iterable[str]]]]
+
+
+class ResponseCache:
+    """Read-through cache of serialized responses in Redis.
+
+    Entries are tagged with the rows they were built from (e.g. "book:<id>").
+    Writes invalidate a tag by bumping its generation, which makes every entry
+    built under an older generation a miss. Tags known up front are read
+    before loading, so a write that commits while an entry is being built
+    still invalidates it. Tags the loader reports can only be read after it,
+    so the entry isn't stored if one of them was invalidated while loading.
+    Loaders should read from the primary: a lagging replica could return
+    rows older than the last invalidation.
+
+    Concurrent misses for a key share one load within the process; across
+    processes a short Redis lock lets one worker fill the entry while the
+    others wait for it. Redis errors fall back to loading from the database.
+    """
+
+    def __init__(self, redis: Redis, ttl: int) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self._get_fresh = redis.register_script(GET_FRESH)
+        self._loading: dict[str, asyncio.Future[CachedResponse]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def get_or_load(
+        self, key: str, tags: Iterable[str], load: Loader
+    ) -> CachedResponse:
+        if not self.enabled:
+            response, _ = await load()
+            return response
+        try:
+            if (response := await self._get(key)) is not None:
+                return response
+        except RedisError:
+            logger.warning("Response cache read failed", exc_info=True)
+            response, _ = await load()
+            return response
+
+        if (future := self._loading.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The request filling the entry was cancelled, take over.
+                return await self.get_or_load(key, tags, load)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            response = await self._fill(key, list(tags), load)
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't log it as never retrieved.
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            if not future.done():
+                # Cancelled while filling, e.g. the client went away.
+                future.cancel()
+            del self._loading[key]
+
+    async def invalidate(self, *tags: str) -> None:
+        if not self.enabled or not tags:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.incr(GENERATION_PREFIX + tag)
+                    # Outlives every entry built under the old generation.
+                    pipe.expire(GENERATION_PREFIX + tag, self.ttl * 2)
+                    # Outlives any fill that started before the bump.
+                    pipe.set(INVALIDATED_PREFIX + tag, 1, px=FILL_LOCK_MS)
+                await pipe.execute()
+        except RedisError:
+            logger.warning("Response cache invalidation failed", exc_info=True)
+
+    async def _get(self, key: str) -> CachedResponse | None:
+        entry = await self._get_fresh(keys=[KEY_PREFIX + key], args=[GENERATION_PREFIX])
+        if entry is None:
+            return None
+        header, _, body = entry.partition(b"\n")
+        return CachedResponse(etag=json.loads(header)["etag"], body=body)
+
+    async def _fill(self, key: str, tags: list[str], load: Loader) -> CachedResponse:
+        try:
+            generations = await self._generations(tags)
+            locked = await self.redis.set(
+                LOCK_PREFIX + key, 1, nx=True, px=FILL_LOCK_MS
+            )
+            if not locked:
+                # Another worker is filling the entry, give it a moment.
+                for _ in range(FILL_WAIT_ATTEMPTS):
+                    await asyncio.sleep(FILL_WAIT_SECONDS)
+                    if (response := await self._get(key)) is not None:
+                        return response
+        except RedisError:
+            logger.warning("Response cache read failed", exc_info=True)
+            response, _ = await load()
+            return response
+
+        try:
+            start = time.monotonic()
+            response, extra_tags = await load()
+            extra = await self._loaded_generations(
+                [tag for tag in extra_tags if tag not in generations],
+                time.monotonic() - start,
+            )
+            if extra is not None:
+                header = json.dumps(
+                    {"etag": response.etag, "tags": generations | extra}
+                )
+                await self.redis.set(
+                    KEY_PREFIX + key,
+                    header.encode() + b"\n" + response.body,
+                    ex=self.ttl,
+                )
+        except RedisError:
+            logger.warning("Response cache write failed", exc_info=True)
+        finally:
+            if locked:
+                await self._unlock(key)
+        return response
+
+    async def _unlock(self, key: str) -> None:
+        try:
+            await self.redis.delete(LOCK_PREFIX + key)
+        except RedisError:
+            logger.warning("Response cache unlock failed", exc_info=True)
+
+    async def _loaded_generations(
+        self, tags: list[str], load_seconds: float
+    ) -> dict[str, str] | None:
+        """Generations of tags reported by a loader, None if one was just bumped.
+
+        The load may have read the rows before that write committed, so its
+        response can't be stamped with the new generation.
+        """
+        if not tags:
+            return {}
+        if load_seconds * 1000 >= FILL_LOCK_MS:
+            # The invalidation markers may have expired since the load started.
+            return None
+        values = await self.redis.mget(
+            [GENERATION_PREFIX + tag for tag in tags]
+            + [INVALIDATED_PREFIX + tag for tag in tags]
+        )
+        if any(value is not None for value in values[len(tags) :]):
+            return None
+        return {
+            tag: value.decode() if value is not None else "0"
+            for tag, value in zip(tags, values)
+        }
+
+    async def _generations(self, tags: list[str]) -> dict[str, str]:
+        if not tags:
+            return {}
+        values = await self.redis.mget([GENERATION_PREFIX + tag for tag in tags])
+        return {
+            tag: value.decode() if value is not None else "0"
+            for tag, value in zip(tags, values)
+        }
+
+
+response_cache = ResponseCache(
+    Redis(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        password=Config.REDIS_PASSWORD,
+    ),
+    ttl=Config.RESPONSE_CACHE_TTL,
+)
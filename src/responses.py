@@ -0,0 +1,40 @@
+from typing import Any
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+
+def dump_json(
+    adapter: TypeAdapter[Any], content: Any, exclude_unset: bool = False
+) -> bytes:
+    """Validate ORM objects into the adapter's type and serialize them to JSON.
+
+    Both steps run in pydantic-core, skipping the response_model round trip
+    through Python dicts and a second JSON encoder.
+    """
+    return adapter.dump_json(
+        adapter.validate_python(content, from_attributes=True),
+        exclude_unset=exclude_unset,
+    )
+
+
+def json_response(
+    adapter: TypeAdapter[Any],
+    content: Any,
+    status_code: int = status.HTTP_200_OK,
+    headers_from: Response | None = None,
+) -> Response:
+    """A JSON response for `content`, serialized with dump_json().
+
+    FastAPI drops the headers and cookies set on the `Response` it injects,
+    e.g. by dependencies, when a handler returns its own response; pass it as
+    `headers_from` to keep them.
+    """
+    response = Response(
+        content=dump_json(adapter, content),
+        status_code=status_code,
+        media_type="application/json",
+    )
+    if headers_from is not None:
+        response.headers.raw.extend(headers_from.headers.raw)
+    return response
@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import Depends, Query
+
+from src.fieldsets import FieldSet, fieldset_dependency
+
+from .schemas import ReviewPublicWithUserAndBook
+
+
+@dataclass
+class ReviewFilter:
+    min_rating: Annotated[int | None, Query(ge=1, le=5)] = None
+    max_rating: Annotated[int | None, Query(ge=1, le=5)] = None
+    created_after: Annotated[datetime | None, Query()] = None
+    created_before: Annotated[datetime | None, Query()] = None
+
+
+ReviewFilterDep = Annotated[ReviewFilter, Depends()]
+
+ReviewFieldSetDep = Annotated[
+    FieldSet,
+    Depends(fieldset_dependency(ReviewPublicWithUserAndBook, ("user", "book"))),
+]
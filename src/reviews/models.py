@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import TYPE_CHECKING
 
 import sqlalchemy.dialects.postgresql as pg
-from sqlmodel import Column, Field, Relationship, SQLModel
+from sqlmodel import Column, Field, Index, Relationship, SQLModel
 
 if TYPE_CHECKING:
     from src.auth.models import User
@@ -12,6 +12,7 @@ if TYPE_CHECKING:
 
 class Review(SQLModel, table=True):
     __tablename__ = "reviews"  # type: ignore[reportAssignmentType]
+    __table_args__ = (Index("ix_reviews_created_at_id", "created_at", "id"),)
     id: uuid.UUID = Field(
         sa_column=Column(
             pg.UUID,
@@ -20,11 +21,19 @@ class Review(SQLModel, table=True):
             default=uuid.uuid4,
         )
     )
-    user_id: uuid.UUID | None = Field(default=None, foreign_key="users.id")
-    book_id: uuid.UUID | None = Field(default=None, foreign_key="books.id")
+    user_id: uuid.UUID | None = Field(default=None, foreign_key="users.id", index=True)
+    book_id: uuid.UUID | None = Field(
+        default=None, foreign_key="books.id", index=True, ondelete="CASCADE"
+    )
     content: str
-    rating: int = Field(le=5)
+    rating: int = Field(ge=1, le=5)
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    user: "User" = Relationship(back_populates="reviews")
-    book: "Book" = Relationship(back_populates="reviews")
+    updated_at: datetime = Field(
+        sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now)
+    )
+    user: "User" = Relationship(
+        back_populates="reviews", sa_relationship_kwargs={"lazy": "raise"}
+    )
+    book: "Book" = Relationship(
+        back_populates="reviews", sa_relationship_kwargs={"lazy": "raise"}
+    )
@@ -1,34 +1,81 @@
 import uuid
-from collections.abc import Sequence
+from typing import Annotated, Any
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Body, Query, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlmodel import select
 
 from src.auth.dependencies.token import AccessTokenDep
-from src.auth.dependencies.user import admin_user_role_checker
-from src.database import SessionDep
+from src.auth.dependencies.user import admin_role_checker, admin_user_role_checker
+from src.database import PrimarySessionDep, SessionDep, SessionFactoryDep
+from src.exports import ExportFormat, export_response
+from src.http_cache import (
+    IfNoneMatch,
+    cached_json_response,
+    conditional_json_response,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
+from src.pagination import PageParamsDep
+from src.response_cache import response_cache
+from src.responses import json_response
+from src.schemas import Page, partial_model
 
+from .dependencies import ReviewFieldSetDep, ReviewFilterDep
 from .models import Review
 from .schemas import (
+    REVIEW_BATCH_MAX_SIZE,
+    ReviewBatchResult,
     ReviewCreate,
     ReviewPublicWithUserAndBook,
     ReviewUpdate,
 )
-from .service import ReviewServiceDep
+from .service import ReviewServiceDep, review_adapter
 
 router = APIRouter()
 
+ReviewPage = Page[partial_model(ReviewPublicWithUserAndBook)]  # type: ignore[misc]
+review_page_adapter = TypeAdapter(ReviewPage)
+
 
 @router.get(
     "",
-    response_model=Sequence[ReviewPublicWithUserAndBook],
+    response_model=ReviewPage,
     dependencies=[admin_user_role_checker],
 )
 async def get_reviews(
+    page: PageParamsDep,
+    filters: ReviewFilterDep,
+    fieldset: ReviewFieldSetDep,
     session: SessionDep,
     access_token: AccessTokenDep,
     service: ReviewServiceDep,
-) -> Sequence[Review]:
-    return await service.get_reviews(session)
+    if_none_match: IfNoneMatch = None,
+) -> Response:
+    reviews, next_cursor = await service.get_reviews(page, filters, fieldset, session)
+    return conditional_json_response(
+        review_page_adapter,
+        {
+            "items": [fieldset.dump(review) for review in reviews],
+            "next_cursor": next_cursor,
+        },
+        if_none_match,
+        exclude_unset=True,
+    )
+
+
+@router.get("/export", dependencies=[admin_role_checker])
+async def export_reviews(
+    session_factory: SessionFactoryDep,
+    access_token: AccessTokenDep,
+    fmt: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON,
+    gzip: bool = False,
+) -> StreamingResponse:
+    return export_response(
+        select(Review.__table__), session_factory, fmt, gzip, "reviews"
+    )
 
 
 @router.get(
@@ -39,10 +86,21 @@ async def get_reviews(
 async def get_review(
     review_id: uuid.UUID,
     session: SessionDep,
+    primary_session: PrimarySessionDep,
     access_token: AccessTokenDep,
     service: ReviewServiceDep,
-) -> Review:
-    return await service.get_review(review_id, session)
+    if_none_match: IfNoneMatch = None,
+) -> Response:
+    if if_none_match is not None and not response_cache.enabled:
+        # Answer revalidations from a cheap version query.
+        etag = make_etag(await service.get_review_version(review_id, session))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    # Cache entries are filled from the primary, which only connects on a miss.
+    fill_session = primary_session if response_cache.enabled else session
+    return cached_json_response(
+        await service.get_review_response(review_id, fill_session), if_none_match
+    )
 
 
 @router.post(
@@ -55,12 +113,33 @@ async def create_review(
     book_id: uuid.UUID,
     review: ReviewCreate,
     session: SessionDep,
+    response: Response,
     access_token: AccessTokenDep,
     service: ReviewServiceDep,
-) -> Review:
-    return await service.create_review(
+) -> Response:
+    created = await service.create_review(
         uuid.UUID(access_token.user["user_id"]), book_id, review, session
     )
+    # Keeps the primary pin cookie get_session sets on `response`.
+    return json_response(review_adapter, created, status.HTTP_201_CREATED, response)
+
+
+@router.post(
+    "/batch",
+    response_model=ReviewBatchResult,
+    dependencies=[admin_user_role_checker],
+)
+async def create_reviews(
+    reviews: Annotated[list[dict[str, Any]], Body(max_length=REVIEW_BATCH_MAX_SIZE)],
+    session: SessionDep,
+    access_token: AccessTokenDep,
+    service: ReviewServiceDep,
+) -> ReviewBatchResult:
+    # Items are validated one by one in the service so a bad item is reported
+    # instead of rejecting the whole batch.
+    return await service.create_reviews(
+        uuid.UUID(access_token.user["user_id"]), reviews, session
+    )
 
 
 @router.patch(
@@ -72,10 +151,12 @@ async def update_review(
     review_id: uuid.UUID,
     review: ReviewUpdate,
     session: SessionDep,
+    response: Response,
     access_token: AccessTokenDep,
     service: ReviewServiceDep,
-) -> Review:
-    return await service.update_review(review_id, review, session)
+) -> Response:
+    updated = await service.update_review(review_id, review, session)
+    return json_response(review_adapter, updated, headers_from=response)
 
 
 @router.delete(
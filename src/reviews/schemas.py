@@ -1,17 +1,37 @@
-from pydantic import BaseModel
+import uuid
+
+from pydantic import BaseModel, Field
 
 from src.schemas import Identifier
 
+REVIEW_BATCH_MAX_SIZE = 1000
+
 
 class ReviewBase(BaseModel):
     content: str
-    rating: int
+    rating: int = Field(ge=1, le=5)
 
 
 class ReviewCreate(ReviewBase): ...
 
 
-class ReviewUpdate(ReviewBase): ...
+class ReviewBatchItem(ReviewCreate):
+    book_id: uuid.UUID
+
+
+class ReviewBatchError(BaseModel):
+    index: int
+    errors: list[str]
+
+
+class ReviewBatchResult(BaseModel):
+    created: list[uuid.UUID] = []
+    errors: list[ReviewBatchError] = []
+
+
+class ReviewUpdate(BaseModel):
+    content: str | None = None
+    rating: int | None = Field(default=None, ge=1, le=5)
 
 
 class ReviewPublic(ReviewBase, Identifier): ...
@@ -1,26 +1,193 @@
 import uuid
-from collections.abc import Sequence
-from typing import Annotated
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from typing import Annotated, Any
 
+import sqlalchemy.dialects.postgresql as pg
 from fastapi import Depends, HTTPException, status
-from sqlmodel import desc, select
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import Float, Update, bindparam, case, cast
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlmodel import col, delete, insert, select, update
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.auth.models import User
+from src.books.models import Book
+from src.fieldsets import FieldSet
+from src.http_cache import make_etag
+from src.pagination import PageParams, S, paginate
+from src.response_cache import CachedResponse, response_cache
+from src.responses import dump_json
+from src.schemas import validation_messages
+
+from .dependencies import ReviewFilter
 from .models import Review
-from .schemas import ReviewCreate, ReviewUpdate
+from .schemas import (
+    ReviewBatchError,
+    ReviewBatchItem,
+    ReviewBatchResult,
+    ReviewCreate,
+    ReviewPublicWithUserAndBook,
+    ReviewUpdate,
+)
+
+
+def load_options(
+    fieldset: FieldSet | None = None, *keys: str
+) -> tuple[LoaderOption, ...]:
+    """Loader options for ReviewPublicWithUserAndBook.
+
+    With a fieldset only its columns (plus any `keys` needed for paging) and
+    expanded relationships are loaded.
+    """
+    if fieldset is None:
+        return (joinedload(Review.user), joinedload(Review.book))  # type: ignore[arg-type]
+    columns = {*fieldset.fields, *keys}
+    options: list[LoaderOption] = [
+        load_only(*(getattr(Review, name) for name in columns))
+    ]
+    for relationship in ("user", "book"):
+        if relationship in fieldset.expand:
+            options.append(joinedload(getattr(Review, relationship)))
+    return tuple(options)
+
+
+def filter_reviews(statement: S, filters: ReviewFilter) -> S:
+    if filters.min_rating is not None:
+        statement = statement.where(Review.rating >= filters.min_rating)
+    if filters.max_rating is not None:
+        statement = statement.where(Review.rating <= filters.max_rating)
+    if filters.created_after is not None:
+        statement = statement.where(Review.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        statement = statement.where(Review.created_at < filters.created_before)
+    return statement
+
+
+RATINGS = range(1, 6)
+
+
+def rating_delta_statement() -> Update:
+    """UPDATE one book's rating aggregates by the deltas bound per execution."""
+    books = Book.__table__
+    review_count = books.c.review_count + bindparam("count")
+    rating_sum = books.c.rating_sum + bindparam("sum")
+    return (
+        update(books)
+        .where(books.c.id == bindparam("book_id"))
+        .values(
+            review_count=review_count,
+            rating_sum=rating_sum,
+            rating_histogram=pg.array(
+                [
+                    books.c.rating_histogram[rating] + bindparam(f"rating_{rating}")
+                    for rating in RATINGS
+                ]
+            ),
+            average_rating=case(
+                (review_count > 0, cast(rating_sum, Float) / cast(review_count, Float)),
+                else_=0.0,
+            ),
+        )
+    )
+
+
+def rating_delta(
+    book_id: uuid.UUID, added: Iterable[int] = (), removed: Iterable[int] = ()
+) -> dict[str, Any]:
+    delta: dict[str, Any] = {"book_id": book_id, "count": 0, "sum": 0}
+    delta |= {f"rating_{rating}": 0 for rating in RATINGS}
+    for ratings, sign in ((added, 1), (removed, -1)):
+        for rating in ratings:
+            delta["count"] += sign
+            delta["sum"] += sign * rating
+            if rating in RATINGS:
+                delta[f"rating_{rating}"] += sign
+    return delta
+
+
+async def apply_rating_deltas(
+    deltas: list[dict[str, Any]], session: AsyncSession
+) -> None:
+    # Core executemany on the session's connection: an ORM UPDATE with a
+    # WHERE clause can't take several parameter sets.
+    connection = await session.connection()
+    await connection.execute(rating_delta_statement(), deltas)
+
+
+review_adapter = TypeAdapter(ReviewPublicWithUserAndBook)
+
+
+def review_version(review: Review) -> tuple[Any, ...]:
+    """What a ReviewPublicWithUserAndBook response depends on, for its ETag."""
+    return (
+        review.id,
+        review.updated_at,
+        review.user.updated_at if review.user is not None else None,
+        review.book.updated_at if review.book is not None else None,
+    )
 
 
 class ReviewService:
-    async def get_reviews(self, session: AsyncSession) -> Sequence[Review]:
-        result = await session.exec(select(Review).order_by(desc(Review.created_at)))
-        return result.all()
+    async def get_reviews(
+        self,
+        page: PageParams,
+        filters: ReviewFilter,
+        fieldset: FieldSet,
+        session: AsyncSession,
+    ) -> tuple[Sequence[Review], str | None]:
+        return await paginate(
+            filter_reviews(select(Review), filters).options(
+                *load_options(fieldset, "created_at")
+            ),
+            Review,
+            page,
+            session,
+        )
 
     async def get_review(self, review_id: uuid.UUID, session: AsyncSession) -> Review:
-        result = await session.exec(select(Review).where(Review.id == review_id))
+        result = await session.exec(
+            select(Review)
+            .where(Review.id == review_id)
+            .options(*load_options())
+            .execution_options(populate_existing=True)
+        )
         if (result := result.first()) is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
         return result
 
+    async def get_review_response(
+        self, review_id: uuid.UUID, session: AsyncSession
+    ) -> CachedResponse:
+        """The serialized review, through the response cache."""
+
+        async def load() -> tuple[CachedResponse, list[str]]:
+            review = await self.get_review(review_id, session)
+            response = CachedResponse(
+                etag=make_etag(review_version(review)),
+                body=dump_json(review_adapter, review),
+            )
+            return response, [f"user:{review.user_id}", f"book:{review.book_id}"]
+
+        return await response_cache.get_or_load(
+            f"review:{review_id}", [f"review:{review_id}"], load
+        )
+
+    async def get_review_version(
+        self, review_id: uuid.UUID, session: AsyncSession
+    ) -> tuple[Any, ...]:
+        """review_version() of a review, without loading it or its relationships."""
+        result = await session.exec(
+            select(Review.id, Review.updated_at, User.updated_at, Book.updated_at)
+            .outerjoin(User, col(Review.user_id) == User.id)
+            .outerjoin(Book, col(Review.book_id) == Book.id)
+            .where(Review.id == review_id)
+        )
+        if (version := result.first()) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        return tuple(version)
+
     async def create_review(
         self,
         user_id: uuid.UUID,
@@ -30,22 +197,136 @@ class ReviewService:
     ) -> Review:
         review_create = Review(**review.model_dump(), user_id=user_id, book_id=book_id)
         session.add(review_create)
+        await apply_rating_deltas(
+            [rating_delta(book_id, added=[review.rating])], session
+        )
         await session.commit()
-        return review_create
+        await response_cache.invalidate(f"book:{book_id}")
+        return await self.get_review(review_create.id, session)
+
+    async def create_reviews(
+        self,
+        user_id: uuid.UUID,
+        reviews: list[dict[str, Any]],
+        session: AsyncSession,
+    ) -> ReviewBatchResult:
+        """Validate each item on its own and insert the valid ones in one statement."""
+        result = ReviewBatchResult()
+        valid: list[tuple[int, ReviewBatchItem]] = []
+        for index, review in enumerate(reviews):
+            try:
+                valid.append((index, ReviewBatchItem.model_validate(review)))
+            except ValidationError as e:
+                result.errors.append(
+                    ReviewBatchError(index=index, errors=validation_messages(e))
+                )
+        if not valid:
+            return result
+
+        # Lock the books up front, in id order so concurrent batches can't
+        # deadlock: it keeps them from being deleted before the insert commits
+        # and their rating aggregates are updated below anyway.
+        book_ids = set(
+            (
+                await session.exec(
+                    select(Book.id)
+                    .where(col(Book.id).in_({review.book_id for _, review in valid}))
+                    .order_by(Book.id)
+                    .with_for_update()
+                )
+            ).all()
+        )
+        rows: list[dict[str, Any]] = []
+        ratings: dict[uuid.UUID, list[int]] = defaultdict(list)
+        for index, review in valid:
+            if review.book_id not in book_ids:
+                result.errors.append(
+                    ReviewBatchError(index=index, errors=["book_id: Book not found."])
+                )
+                continue
+            rows.append({**review.model_dump(), "user_id": user_id})
+            ratings[review.book_id].append(review.rating)
+        result.errors.sort(key=lambda error: error.index)
+        if rows:
+            created = await session.exec(
+                insert(Review).values(rows).returning(Review.id)  # type: ignore[arg-type]
+            )
+            result.created = list(created.scalars())
+            await apply_rating_deltas(
+                [
+                    rating_delta(book_id, added=added)
+                    for book_id, added in sorted(ratings.items())
+                ],
+                session,
+            )
+        await session.commit()
+        await response_cache.invalidate(*(f"book:{book_id}" for book_id in ratings))
+        return result
 
     async def update_review(
         self, review_id: uuid.UUID, review: ReviewUpdate, session: AsyncSession
     ) -> Review:
-        review_update = await self.get_review(review_id, session)
-        for k, v in review.model_dump().items():
-            setattr(review_update, k, v)
+        values = review.model_dump(exclude_unset=True, exclude_none=True)
+        if "rating" in values:
+            # Only a rating change touches the book, so only then is the old
+            # rating needed; the row lock keeps it from changing underneath us.
+            old = (
+                await session.exec(
+                    select(Review.book_id, Review.rating)
+                    .where(Review.id == review_id)
+                    .with_for_update()
+                )
+            ).first()
+            if old is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+            book_id, old_rating = old
+            if book_id is not None and old_rating != values["rating"]:
+                await apply_rating_deltas(
+                    [
+                        rating_delta(
+                            book_id, added=[values["rating"]], removed=[old_rating]
+                        )
+                    ],
+                    session,
+                )
+        statement = (
+            update(Review)
+            .where(Review.id == review_id)  # type: ignore[arg-type]
+            .values(**values)
+            .returning(Review)
+        )
+        result = await session.exec(
+            select(Review)
+            .from_statement(statement)
+            .options(selectinload(Review.user), selectinload(Review.book))  # type: ignore[arg-type]
+            .execution_options(populate_existing=True)
+        )
+        if (review_update := result.scalar_one_or_none()) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
         await session.commit()
+        book_id = review_update.book_id
+        await response_cache.invalidate(
+            f"review:{review_id}", *([f"book:{book_id}"] if book_id else [])
+        )
         return review_update
 
     async def delete_review(self, review_id: uuid.UUID, session: AsyncSession) -> None:
-        review_delete = await self.get_review(review_id, session)
-        await session.delete(review_delete)
+        result = await session.exec(
+            delete(Review)
+            .where(Review.id == review_id)  # type: ignore[arg-type]
+            .returning(Review.book_id, Review.rating)
+        )
+        if (deleted := result.first()) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        book_id, rating = deleted
+        if book_id is not None:
+            await apply_rating_deltas(
+                [rating_delta(book_id, removed=[rating])], session
+            )
         await session.commit()
+        await response_cache.invalidate(
+            f"review:{review_id}", *([f"book:{book_id}"] if book_id else [])
+        )
 
 
 ReviewServiceDep = Annotated[ReviewService, Depends(ReviewService)]
@@ -0,0 +1,116 @@
+import uuid
+
+import pytest
+import pytest_asyncio
+from fastapi import status
+from httpx import AsyncClient
+
+from src import database
+from src.conftest import async_session
+from src.main import app
+
+from .schemas import REVIEW_BATCH_MAX_SIZE
+
+REVIEW_ENDPOINT_PREFIX = "/api/v1/reviews"
+BOOK_ENDPOINT_PREFIX = "/api/v1/books"
+
+
+@pytest_asyncio.fixture
+async def book_id(
+    test_async_client: AsyncClient, mock_logged_in_user: dict[str, str | dict[str, str]]
+) -> str:
+    response = await test_async_client.post(
+        BOOK_ENDPOINT_PREFIX,
+        json={
+            "title": "Reviewed Book",
+            "author": "Jane Doe",
+            "publisher": "Jane Doe",
+            "published_date": "2022-01-01",
+            "page_count": 100,
+            "language": "English",
+        },
+        headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_create_reviews(
+    test_async_client: AsyncClient,
+    mock_logged_in_user: dict[str, str | dict[str, str]],
+    book_id: str,
+    sql_statements: list[str],
+) -> None:
+    reviews = [
+        {"book_id": book_id, "content": "Loved it", "rating": 5},
+        {"book_id": book_id, "content": "Out of range", "rating": 6},
+        {"book_id": book_id, "rating": 3},
+        {"book_id": str(uuid.uuid4()), "content": "No such book", "rating": 4},
+        {"book_id": book_id, "content": "Fine", "rating": 3},
+    ]
+    response = await test_async_client.post(
+        f"{REVIEW_ENDPOINT_PREFIX}/batch",
+        json=reviews,
+        headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert len(result["created"]) == 2
+    assert [error["index"] for error in result["errors"]] == [1, 2, 3]
+    assert result["errors"][2]["errors"] == ["book_id: Book not found."]
+    # Locking the books, one INSERT for every review and one UPDATE per book.
+    assert len(sql_statements) == 3, sql_statements
+
+    response = await test_async_client.get(
+        f"{BOOK_ENDPOINT_PREFIX}/{book_id}",
+        headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
+    )
+    assert response.json()["review_count"] == 2
+    assert response.json()["rating_histogram"] == [0, 0, 1, 0, 1]
+
+
+@pytest.mark.asyncio
+async def test_create_reviews_rejects_oversized_batch(
+    test_async_client: AsyncClient,
+    mock_logged_in_user: dict[str, str | dict[str, str]],
+    book_id: str,
+) -> None:
+    review = {"book_id": book_id, "content": "Again", "rating": 4}
+    response = await test_async_client.post(
+        f"{REVIEW_ENDPOINT_PREFIX}/batch",
+        json=[review] * (REVIEW_BATCH_MAX_SIZE + 1),
+        headers={"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"},
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_review_writes_pin_reads_to_primary(
+    test_async_client: AsyncClient,
+    mock_logged_in_user: dict[str, str | dict[str, str]],
+    book_id: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Use the real get_session, which sets the cookie, on the test database.
+    monkeypatch.delitem(app.dependency_overrides, database.get_session)
+    monkeypatch.setattr(database, "async_session", async_session)
+    monkeypatch.setattr(database, "replica_session", async_session)
+    headers = {"Authorization": f"Bearer {mock_logged_in_user["access_token"]}"}
+
+    response = await test_async_client.post(
+        f"{REVIEW_ENDPOINT_PREFIX}/books/{book_id}",
+        json={"content": "Pinned", "rating": 4},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.cookies[database.PRIMARY_PIN_COOKIE] == "1"
+
+    response = await test_async_client.patch(
+        f"{REVIEW_ENDPOINT_PREFIX}/{response.json()["id"]}",
+        json={"rating": 5},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.cookies[database.PRIMARY_PIN_COOKIE] == "1"
+    test_async_client.cookies.clear()
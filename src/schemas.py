@@ -1,10 +1,41 @@
 import uuid
 from datetime import datetime
+from functools import cache
+from typing import Any, Generic, Optional, TypeVar
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, create_model
+
+T = TypeVar("T")
 
 
 class Identifier(BaseModel):
     id: uuid.UUID
     created_at: datetime
     updated_at: datetime
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
+
+def validation_messages(error: ValidationError) -> list[str]:
+    return [
+        f"{'.'.join(map(str, e['loc'])) or 'body'}: {e['msg']}" for e in error.errors()
+    ]
+
+
+@cache
+def partial_model(model: type[BaseModel]) -> type[BaseModel]:
+    """Copy of `model` with every field optional, for sparse fieldsets.
+
+    Routes using it pass exclude_unset=True to `conditional_json_response` so
+    fields that weren't selected are left out rather than returned as null.
+    """
+    # Resolve forward references to schemas imported after `model`.
+    model.model_rebuild()
+    fields: dict[str, Any] = {
+        name: (Optional[field.annotation], None)
+        for name, field in model.model_fields.items()
+    }
+    return create_model(f"Partial{model.__name__}", **fields)
@@ -0,0 +1,165 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any
+
+from fastapi import HTTPException, status
+from kombu.exceptions import OperationalError
+
+from celery import Celery, Task
+
+from .celery import app as celery_app
+from .config import Config
+from .metrics import (
+    TASK_DISPATCH_QUEUE_DEPTH,
+    TASK_PUBLISH_SECONDS,
+    TASKS_DISPATCHED,
+    TASKS_DROPPED,
+    TASKS_REJECTED,
+    TASKS_RETRIED,
+)
+
+PUBLISH_BATCH_SIZE = 100
+PUBLISH_RETRY_SECONDS = 0.5
+PUBLISH_RETRY_MAX_SECONDS = 30
+# Failures worth retrying; anything else is a problem with the task itself.
+BROKER_ERRORS = (OperationalError, OSError)
+
+logger = logging.getLogger(__name__)
+
+
+class TaskDispatcher:
+    """Publishes Celery tasks from a background thread.
+
+    Publishing is a blocking call to the broker, so handlers only put tasks
+    on a bounded queue, which never blocks the event loop. A publisher thread
+    drains it, sending whatever has piled up over one broker connection. Tasks
+    the broker doesn't take are kept and published again with backoff, while
+    new ones wait in the queue. Once `max_pending` tasks are waiting, new ones
+    are rejected with a 503 instead of queueing without bound, so a broker
+    outage turns into errors callers see rather than lost tasks.
+    """
+
+    def __init__(self, app: Celery, max_pending: int) -> None:
+        self.app = app
+        self._queue: queue.Queue[tuple[Task, tuple[Any, ...]] | None] = queue.Queue(
+            max_pending
+        )
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        TASK_DISPATCH_QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    def dispatch(self, task: Task, *args: Any) -> None:
+        self._start()
+        try:
+            self._queue.put_nowait((task, args))
+        except queue.Full:
+            TASKS_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry later.",
+                headers={"Retry-After": "1"},
+            )
+
+    def shutdown(self, timeout: float = 5) -> None:
+        """Publish the tasks still queued, waiting up to `timeout` seconds."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        # Cut a retry backoff short, the remaining tasks get one last attempt.
+        self._stopping.set()
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Task queue still full at shutdown")
+        thread.join(timeout)
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="task-publisher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        batch: list[tuple[Task, tuple[Any, ...]]] = []
+        delay = PUBLISH_RETRY_SECONDS
+        while True:
+            stopping = self._collect(batch)
+            if batch:
+                batch = self._publish(batch)
+            if not batch:
+                if stopping:
+                    return
+                delay = PUBLISH_RETRY_SECONDS
+                continue
+            if stopping or self._stopping.is_set():
+                # Shutting down and the broker still fails, give up on them.
+                TASKS_DROPPED.inc(len(batch))
+                logger.error("Dropping %d unpublished tasks", len(batch))
+                return
+            TASKS_RETRIED.inc(len(batch))
+            self._stopping.wait(delay)
+            delay = min(delay * 2, PUBLISH_RETRY_MAX_SECONDS)
+
+    def _collect(self, batch: list[tuple[Task, tuple[Any, ...]]]) -> bool:
+        """Add queued tasks to `batch`, waiting for one if it's empty.
+
+        Returns whether the dispatcher is shutting down.
+        """
+        if not batch:
+            if (item := self._queue.get()) is None:
+                return True
+            batch.append(item)
+        while len(batch) < PUBLISH_BATCH_SIZE:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    def _publish(
+        self, batch: list[tuple[Task, tuple[Any, ...]]]
+    ) -> list[tuple[Task, tuple[Any, ...]]]:
+        """Publish `batch`, returning the tasks to retry after a broker error.
+
+        A task that fails for another reason, e.g. arguments that can't be
+        serialized, would fail again: it is dropped so it can't hold up the
+        tasks queued behind it.
+        """
+        start = time.perf_counter()
+        published = done = 0
+        try:
+            with self.app.producer_or_acquire() as producer:
+                for task, args in batch:
+                    try:
+                        # Nothing waits on the result, don't subscribe to it.
+                        task.apply_async(args, producer=producer, ignore_result=True)
+                    except BROKER_ERRORS:
+                        raise
+                    except Exception:
+                        TASKS_DROPPED.inc()
+                        logger.exception("Dropping task %s", task.name)
+                    else:
+                        published += 1
+                    done += 1
+        except Exception:
+            # Broker errors, or failing to get a producer at all.
+            logger.exception("Failed to publish %d tasks", len(batch) - done)
+        finally:
+            TASKS_DISPATCHED.inc(published)
+            TASK_PUBLISH_SECONDS.observe(time.perf_counter() - start)
+        return batch[done:]
+
+
+dispatcher = TaskDispatcher(celery_app, max_pending=Config.TASK_QUEUE_SIZE)
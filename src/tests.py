@@ -1,7 +1,746 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import smtplib
+import time
+import uuid
+from collections.abc import AsyncGenerator, Generator
+from datetime import date
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from celery.exceptions import Retry
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import database, email, exports, middlewares, outbox, tasks
+from .auth.utils import create_token
+from .books.models import Book
+from .cache import TTLCache
+from .celery import app as celery_app
+from .celery import send_email, send_template_email, send_template_emails
+from .config import Config
+from .conftest import async_session
+from .email import EmailTemplate, Mailer, build_message, is_transient
+from .exports import ExportFormat, export_response
+from .middlewares import LoadShedMiddleware
+from .outbox import OutboxMessage, add_outbox_message, relay_batch
+from .rate_limit import KEY_PREFIX, Budget, RateLimiter, request_budgets
+from .response_cache import CachedResponse, ResponseCache
+from .tasks import TaskDispatcher
 
 
 def test_root(test_sync_client: TestClient) -> None:
     response = test_sync_client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Hello World!"}
+
+
+def test_ttl_cache_expires_entries() -> None:
+    cache = TTLCache[str, int](maxsize=10, ttl=60)
+    cache.set("fresh", 1)
+    cache.set("stale", 2, ttl=0)
+    time.sleep(0.001)
+    assert cache.get("fresh") == 1
+    assert cache.get("stale") is None
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    cache = TTLCache[str, int](maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+@pytest.mark.asyncio
+async def test_get_session_pins_token_to_primary_after_write(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(
+        database, "replica_session", async_sessionmaker(class_=AsyncSession)
+    )
+
+    async def session_bind(method: str, token: str) -> object:
+        request = Request(
+            {
+                "type": "http",
+                "method": method,
+                "headers": [(b"authorization", f"Bearer {token}".encode())],
+            }
+        )
+        sessions = database.get_session(request, Response())
+        session = await anext(sessions)
+        await sessions.aclose()
+        return session.sync_session.bind
+
+    assert await session_bind("GET", "writer") is None
+    assert await session_bind("POST", "writer") is database.async_engine.sync_engine
+    assert await session_bind("GET", "writer") is database.async_engine.sync_engine
+    assert await session_bind("GET", "reader") is None
+
+
+@pytest_asyncio.fixture
+async def export_statement() -> AsyncGenerator[Select[Any]]:
+    titles = [f"Exported Book {i}" for i in range(5)]
+    async with async_session() as session:
+        session.add_all(
+            Book(
+                id=uuid.uuid4(),
+                title=title,
+                author="Author",
+                publisher="Publisher",
+                page_count=100 + i,
+                language="English",
+                published_date=date(2020, 1, 1 + i),
+            )
+            for i, title in enumerate(titles)
+        )
+        await session.commit()
+    yield (
+        select(Book.title, Book.page_count, Book.published_date)
+        .where(col(Book.title).in_(titles))
+        .order_by(Book.title)
+    )
+    async with async_session() as session:
+        await session.exec(delete(Book).where(col(Book.title).in_(titles)))
+        await session.commit()
+
+
+async def read_body(response: StreamingResponse) -> bytes:
+    return b"".join([chunk async for chunk in response.body_iterator])  # type: ignore[misc]
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_in_several_batches(
+    export_statement: Select[Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 2)
+    response = export_response(
+        export_statement, async_session, ExportFormat.NDJSON, False, "books"
+    )
+    chunks = [chunk async for chunk in response.body_iterator]
+    # One chunk per yield_per batch of the server-side cursor.
+    assert len(chunks) == 3
+    rows = [json.loads(line) for line in b"".join(chunks).splitlines()]  # type: ignore[arg-type]
+    assert rows[0] == {
+        "title": "Exported Book 0",
+        "page_count": 100,
+        "published_date": "2020-01-01",
+    }
+    assert [row["title"] for row in rows] == [f"Exported Book {i}" for i in range(5)]
+    assert response.headers["content-disposition"] == (
+        'attachment; filename="books.ndjson"'
+    )
+
+
+@pytest.mark.asyncio
+async def test_export_csv_writes_header_once(
+    export_statement: Select[Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 2)
+    response = export_response(
+        export_statement, async_session, ExportFormat.CSV, False, "books"
+    )
+    rows = list(csv.reader(io.StringIO((await read_body(response)).decode())))
+    assert rows[0] == ["title", "page_count", "published_date"]
+    assert rows[1] == ["Exported Book 0", "100", "2020-01-01"]
+    assert len(rows) == 6
+    assert response.media_type == "text/csv"
+
+
+@pytest.mark.asyncio
+async def test_export_gzip_round_trip(export_statement: Select[Any]) -> None:
+    plain = await read_body(
+        export_response(
+            export_statement, async_session, ExportFormat.NDJSON, False, "books"
+        )
+    )
+    response = export_response(
+        export_statement, async_session, ExportFormat.NDJSON, True, "books"
+    )
+    assert gzip.decompress(await read_body(response)) == plain
+    assert response.media_type == "application/gzip"
+    assert response.headers["content-disposition"] == (
+        'attachment; filename="books.ndjson.gz"'
+    )
+
+
+@pytest_asyncio.fixture
+async def response_cache() -> AsyncGenerator[ResponseCache]:
+    redis = Redis(
+        host=Config.REDIS_HOST, port=Config.REDIS_PORT, password=Config.REDIS_PASSWORD
+    )
+    yield ResponseCache(redis, ttl=60)
+    await redis.aclose()
+
+
+class CountingLoader:
+    def __init__(self, extra_tags: list[str] | None = None) -> None:
+        self.extra_tags = extra_tags or []
+        self.calls = 0
+
+    async def __call__(self) -> tuple[CachedResponse, list[str]]:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return CachedResponse(etag=f'"{self.calls}"', body=b"{}"), self.extra_tags
+
+
+@pytest.mark.asyncio
+async def test_response_cache_hit_miss_and_invalidate(
+    response_cache: ResponseCache,
+) -> None:
+    key = tag = f"book:{uuid.uuid4()}"
+    load = CountingLoader()
+    assert (await response_cache.get_or_load(key, [tag], load)).etag == '"1"'
+    assert (await response_cache.get_or_load(key, [tag], load)).etag == '"1"'
+    assert load.calls == 1
+
+    await response_cache.invalidate(tag)
+    assert (await response_cache.get_or_load(key, [tag], load)).etag == '"2"'
+    assert (await response_cache.get_or_load(key, [tag], load)).etag == '"2"'
+    assert load.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_response_cache_loads_concurrent_misses_once(
+    response_cache: ResponseCache,
+) -> None:
+    key = f"book:{uuid.uuid4()}"
+    load = CountingLoader()
+    responses = await asyncio.gather(
+        *(response_cache.get_or_load(key, [key], load) for _ in range(5))
+    )
+    assert load.calls == 1
+    assert {response.etag for response in responses} == {'"1"'}
+
+
+@pytest.mark.asyncio
+async def test_response_cache_waiter_takes_over_cancelled_fill(
+    response_cache: ResponseCache,
+) -> None:
+    key = f"book:{uuid.uuid4()}"
+    started = asyncio.Event()
+
+    async def slow_load() -> tuple[CachedResponse, list[str]]:
+        started.set()
+        await asyncio.sleep(60)
+        raise AssertionError("not cancelled")
+
+    filler = asyncio.create_task(response_cache.get_or_load(key, [key], slow_load))
+    await started.wait()
+    load = CountingLoader()
+    waiter = asyncio.create_task(response_cache.get_or_load(key, [key], load))
+    await asyncio.sleep(0.01)
+    filler.cancel()
+    # The waiter fills the entry itself instead.
+    assert (await asyncio.wait_for(waiter, 1)).etag == '"1"'
+    assert load.calls == 1
+    assert filler.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_response_cache_tracks_tags_found_while_loading(
+    response_cache: ResponseCache,
+) -> None:
+    key, user_tag = f"book:{uuid.uuid4()}", f"user:{uuid.uuid4()}"
+    load = CountingLoader([user_tag])
+    await response_cache.get_or_load(key, [key], load)
+    await response_cache.get_or_load(key, [key], load)
+    assert load.calls == 1
+
+    await response_cache.invalidate(user_tag)
+    await response_cache.get_or_load(key, [key], load)
+    assert load.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_response_cache_skips_store_when_tag_bumped_while_loading(
+    response_cache: ResponseCache,
+) -> None:
+    key, user_tag = f"book:{uuid.uuid4()}", f"user:{uuid.uuid4()}"
+    load = CountingLoader([user_tag])
+
+    async def load_racing_a_write() -> tuple[CachedResponse, list[str]]:
+        response = await load()
+        # The user is updated after the load read it, but before its tag's
+        # generation is read.
+        await response_cache.invalidate(user_tag)
+        return response
+
+    await response_cache.get_or_load(key, [key], load_racing_a_write)
+    await response_cache.get_or_load(key, [key], load)
+    assert load.calls == 2
+
+
+class FakeSMTP:
+    connections: list["FakeSMTP"] = []
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.sent: list[Any] = []
+        self.closed = False
+        self.fail_next: Exception | None = None
+        FakeSMTP.connections.append(self)
+
+    def starttls(self, **kwargs: Any) -> None:
+        pass
+
+    def login(self, username: str, password: str) -> None:
+        pass
+
+    def send_message(self, message: Any) -> None:
+        if self.fail_next is not None:
+            error, self.fail_next = self.fail_next, None
+            raise error
+        self.sent.append(message)
+
+    def quit(self) -> None:
+        self.closed = True
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch: pytest.MonkeyPatch) -> type[FakeSMTP]:
+    FakeSMTP.connections = []
+    monkeypatch.setattr(email.smtplib, "SMTP", FakeSMTP)
+    monkeypatch.setattr(email.Config, "MAIL_SSL_TLS", False)
+    return FakeSMTP
+
+
+@pytest.fixture
+def sync_redis() -> Generator[SyncRedis]:
+    redis = SyncRedis(
+        host=Config.REDIS_HOST, port=Config.REDIS_PORT, password=Config.REDIS_PASSWORD
+    )
+    yield redis
+    redis.close()
+
+
+def test_mailer_reconnects_after_max_messages(
+    fake_smtp: type[FakeSMTP], sync_redis: SyncRedis
+) -> None:
+    mailer = Mailer(sync_redis, rate_limit=0, max_messages=2)
+    for _ in range(5):
+        mailer.send(build_message(["to@example.com"], "Subject", "Body"))
+    assert [len(smtp.sent) for smtp in fake_smtp.connections] == [2, 2, 1]
+    assert [smtp.closed for smtp in fake_smtp.connections] == [True, True, False]
+
+
+def test_mailer_resends_when_the_connection_was_dropped(
+    fake_smtp: type[FakeSMTP], sync_redis: SyncRedis
+) -> None:
+    mailer = Mailer(sync_redis, rate_limit=0, max_messages=100)
+    mailer.send(build_message(["to@example.com"], "Subject", "Body"))
+    fake_smtp.connections[0].fail_next = smtplib.SMTPServerDisconnected()
+    mailer.send(build_message(["to@example.com"], "Subject", "Body"))
+    assert [len(smtp.sent) for smtp in fake_smtp.connections] == [1, 1]
+
+
+def test_mailer_throttles_across_workers(
+    fake_smtp: type[FakeSMTP], sync_redis: SyncRedis, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = [time.time()]
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(email.time, "time", lambda: now[0])
+    monkeypatch.setattr(email.time, "sleep", sleep)
+    start = now[0]
+    mailer = Mailer(sync_redis, rate_limit=2, max_messages=100)
+    for _ in range(3):
+        mailer.send(build_message(["to@example.com"], "Subject", "Body"))
+    assert sleeps == [pytest.approx(int(start) + 1 - start)]
+    assert len(fake_smtp.connections[0].sent) == 3
+
+
+def test_mailer_sends_when_rate_limit_check_fails(fake_smtp: type[FakeSMTP]) -> None:
+    mailer = Mailer(SyncRedis(port=1), rate_limit=1, max_messages=100)
+    mailer.send(build_message(["to@example.com"], "Subject", "Body"))
+    assert len(fake_smtp.connections[0].sent) == 1
+
+
+@pytest.mark.parametrize(
+    ("error", "transient"),
+    [
+        (smtplib.SMTPResponseException(421, b"Too many connections"), True),
+        (smtplib.SMTPDataError(452, b"Quota exceeded"), True),
+        (smtplib.SMTPResponseException(554, b"Rejected"), False),
+        (smtplib.SMTPRecipientsRefused({"a@example.com": (450, b"Greylisted")}), True),
+        (
+            smtplib.SMTPRecipientsRefused(
+                {"a@example.com": (450, b"Greylisted"), "b@example.com": (550, b"No")}
+            ),
+            False,
+        ),
+        (smtplib.SMTPServerDisconnected(), True),
+        (ConnectionRefusedError(), True),
+        (ValueError(), False),
+    ],
+)
+def test_is_transient(error: Exception, transient: bool) -> None:
+    assert is_transient(error) is transient
+
+
+def test_send_template_emails_skips_rejected_and_retries_the_rest(
+    mocker: MockerFixture,
+) -> None:
+    send = mocker.patch.object(
+        email.mailer,
+        "send",
+        side_effect=[
+            None,
+            smtplib.SMTPRecipientsRefused({"b@example.com": (550, b"No such user")}),
+            smtplib.SMTPResponseException(421, b"Try again later"),
+        ],
+    )
+    retry = mocker.patch.object(send_template_emails, "retry", side_effect=Retry())
+    messages = [
+        [[f"{name}@example.com"], EmailTemplate.VERIFY_EMAIL, {"token": name}]
+        for name in ("a", "b", "c", "d")
+    ]
+    with pytest.raises(Retry):
+        send_template_emails(messages)
+    assert send.call_count == 3
+    assert send.call_args.args[0]["To"] == "c@example.com"
+    assert retry.call_args.kwargs["args"] == (messages[2:],)
+
+
+@pytest_asyncio.fixture
+async def outbox_relay(
+    monkeypatch: pytest.MonkeyPatch, mocker: MockerFixture
+) -> AsyncGenerator[Any]:
+    monkeypatch.setattr(outbox, "async_session", async_session)
+    async with async_session() as session:
+        await session.exec(delete(OutboxMessage))
+        await session.commit()
+    mocker.patch.object(outbox.celery_app, "producer_or_acquire")
+    yield mocker.patch.object(outbox.celery_app, "send_task")
+
+
+@pytest.mark.asyncio
+async def test_relay_batch_publishes_and_deletes_messages(outbox_relay: Any) -> None:
+    async with async_session() as session:
+        await add_outbox_message(session, send_email.name, ["a@example.com"], "S", "B")
+        for name in ("b", "c"):
+            await add_outbox_message(
+                session,
+                send_template_email.name,
+                [f"{name}@example.com"],
+                EmailTemplate.VERIFY_EMAIL,
+                {"token": name},
+            )
+        await session.commit()
+
+    assert await relay_batch() == 3
+    published = [
+        (call.args[0], call.kwargs["args"]) for call in outbox_relay.call_args_list
+    ]
+    # The template emails are batched into one task.
+    assert published == [
+        (send_email.name, [["a@example.com"], "S", "B"]),
+        (
+            send_template_emails.name,
+            [
+                [
+                    [["b@example.com"], "verify_email", {"token": "b"}],
+                    [["c@example.com"], "verify_email", {"token": "c"}],
+                ]
+            ],
+        ),
+    ]
+    assert await relay_batch() == 0
+
+
+@pytest.mark.asyncio
+async def test_relay_batch_skips_locked_messages(outbox_relay: Any) -> None:
+    async with async_session() as session:
+        for address in ("a@example.com", "b@example.com"):
+            await add_outbox_message(session, send_email.name, [address], "S", "B")
+        await session.commit()
+
+    async with async_session() as session, session.begin():
+        # Another relay holding the oldest message.
+        await session.exec(
+            select(OutboxMessage)
+            .order_by(col(OutboxMessage.id))
+            .limit(1)
+            .with_for_update()
+        )
+        assert await relay_batch() == 1
+    assert await relay_batch() == 1
+    assert [call.kwargs["args"][0] for call in outbox_relay.call_args_list] == [
+        ["b@example.com"],
+        ["a@example.com"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_relay_batch_keeps_messages_when_publishing_fails(
+    outbox_relay: Any,
+) -> None:
+    async with async_session() as session:
+        await add_outbox_message(session, send_email.name, ["a@example.com"], "S", "B")
+        await session.commit()
+
+    outbox_relay.side_effect = ConnectionError("Broker down")
+    with pytest.raises(ConnectionError):
+        await relay_batch()
+    outbox_relay.side_effect = None
+    assert await relay_batch() == 1
+
+
+@pytest.fixture
+def publish(mocker: MockerFixture) -> Any:
+    mocker.patch.object(celery_app, "producer_or_acquire")
+    return mocker.Mock()
+
+
+def wait_for_calls(mock: Any, count: int) -> None:
+    for _ in range(500):
+        if mock.call_count >= count:
+            return
+        time.sleep(0.01)
+
+
+def test_task_dispatcher_rejects_tasks_when_queue_is_full(
+    mocker: MockerFixture, publish: Any
+) -> None:
+    dispatcher = TaskDispatcher(celery_app, max_pending=1)
+    # No publisher thread, so the queue stays full.
+    mocker.patch.object(dispatcher, "_start")
+    task = mocker.Mock(apply_async=publish)
+    dispatcher.dispatch(task, "first")
+    with pytest.raises(HTTPException) as exc_info:
+        dispatcher.dispatch(task, "second")
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
+
+
+def test_task_dispatcher_publishes_queued_tasks_on_shutdown(
+    mocker: MockerFixture, publish: Any
+) -> None:
+    dispatcher = TaskDispatcher(celery_app, max_pending=10)
+    task = mocker.Mock(apply_async=publish)
+    for i in range(3):
+        dispatcher.dispatch(task, i)
+    dispatcher.shutdown()
+    assert [call.args[0] for call in publish.call_args_list] == [(0,), (1,), (2,)]
+
+
+def test_task_dispatcher_retries_tasks_the_broker_rejected(
+    mocker: MockerFixture, publish: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(tasks, "PUBLISH_RETRY_SECONDS", 0.01)
+    publish.side_effect = [ConnectionError("Broker down"), None]
+    dispatcher = TaskDispatcher(celery_app, max_pending=10)
+    task = mocker.Mock(apply_async=publish)
+    dispatcher.dispatch(task, "first")
+    wait_for_calls(publish, 2)
+    dispatcher.shutdown()
+    assert [call.args[0] for call in publish.call_args_list] == [
+        ("first",),
+        ("first",),
+    ]
+
+
+def test_task_dispatcher_drops_tasks_that_cant_be_published(
+    mocker: MockerFixture, publish: Any
+) -> None:
+    publish.side_effect = [TypeError("Object of type set is not serializable"), None]
+    dispatcher = TaskDispatcher(celery_app, max_pending=10)
+    task = mocker.Mock(apply_async=publish)
+    dispatcher.dispatch(task, {"poison"})
+    dispatcher.dispatch(task, "good")
+    wait_for_calls(publish, 2)
+    dispatcher.shutdown()
+    assert [call.args[0] for call in publish.call_args_list] == [
+        ({"poison"},),
+        ("good",),
+    ]
+
+
+def test_task_dispatcher_shutdown_cuts_retry_backoff_short(
+    mocker: MockerFixture, publish: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(tasks, "PUBLISH_RETRY_SECONDS", 60)
+    publish.side_effect = ConnectionError("Broker down")
+    dispatcher = TaskDispatcher(celery_app, max_pending=10)
+    task = mocker.Mock(apply_async=publish)
+    dispatcher.dispatch(task, "first")
+    wait_for_calls(publish, 1)
+    start = time.monotonic()
+    dispatcher.shutdown()
+    assert time.monotonic() - start < 1
+    # One last attempt before giving up.
+    assert publish.call_count == 2
+
+
+@pytest_asyncio.fixture
+async def rate_limiter() -> AsyncGenerator[RateLimiter]:
+    redis = Redis(
+        host=Config.REDIS_HOST, port=Config.REDIS_PORT, password=Config.REDIS_PASSWORD
+    )
+    yield RateLimiter(redis, TTLCache[str, float](maxsize=100, ttl=60))
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_remembers_the_denied_budget(
+    rate_limiter: RateLimiter, mocker: MockerFixture
+) -> None:
+    take = mocker.patch.object(
+        rate_limiter, "_take", new=mocker.AsyncMock(return_value=[1500, 2])
+    )
+    ip, user = Budget("ip", "ip:1.2.3.4", 10), Budget("user", "user:1", 10)
+    assert await rate_limiter.check([ip, user]) == 1.5
+    assert rate_limiter.blocked.get(user.key) is not None
+    assert rate_limiter.blocked.get(ip.key) is None
+
+    # Turned away locally until the budget has tokens again.
+    assert 0 < await rate_limiter.check([ip, user]) <= 1.5
+    take.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_skips_disabled_budgets(
+    rate_limiter: RateLimiter, mocker: MockerFixture
+) -> None:
+    take = mocker.patch.object(
+        rate_limiter, "_take", new=mocker.AsyncMock(return_value=[0])
+    )
+    assert await rate_limiter.check([Budget("ip", "ip:1.2.3.4", 0)]) == 0
+    take.assert_not_called()
+    await rate_limiter.check(
+        [Budget("ip", "ip:1.2.3.4", 0), Budget("user", "user:1", 10)]
+    )
+    assert take.call_args.kwargs == {
+        "keys": [f"{KEY_PREFIX}user:1"],
+        "args": [10, 10 / 60],
+    }
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_fails_open(
+    rate_limiter: RateLimiter, mocker: MockerFixture
+) -> None:
+    mocker.patch.object(
+        rate_limiter, "_take", new=mocker.AsyncMock(side_effect=RedisError())
+    )
+    assert await rate_limiter.check([Budget("ip", "ip:1.2.3.4", 1)]) == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_takes_from_every_budget_or_none(
+    rate_limiter: RateLimiter,
+) -> None:
+    strict = Budget("route", f"route:{uuid.uuid4()}", 2)
+    loose = Budget("ip", f"ip:{uuid.uuid4()}", 60)
+    assert await rate_limiter.check([loose, strict]) == 0
+    assert await rate_limiter.check([loose, strict]) == 0
+    # The strict bucket is empty and refills one token every 30 seconds.
+    assert 29 < await rate_limiter.check([loose, strict]) <= 30
+    tokens = await rate_limiter.redis.hget(KEY_PREFIX + loose.key, "tokens")
+    assert 58 <= float(tokens) < 58.1  # type: ignore[arg-type]
+
+
+def test_request_budgets() -> None:
+    token = create_token({"user_id": "42"})
+    request = Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": "/api/v1/auth/login",
+            "query_string": b"",
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+            "client": ("1.2.3.4", 1234),
+            "server": ("test", 80),
+            "scheme": "http",
+        }
+    )
+    assert [(budget.kind, budget.key) for budget in request_budgets(request)] == [
+        ("ip", "ip:1.2.3.4"),
+        ("user", "user:42"),
+        ("route", "route:/api/v1/auth/login:1.2.3.4"),
+    ]
+
+    request.scope["headers"] = [(b"authorization", b"Bearer not-a-token")]
+    request = Request(request.scope)
+    assert [budget.kind for budget in request_budgets(request)] == ["ip", "route"]
+
+
+async def call_asgi(app: Any, path: str) -> int:
+    statuses: list[int] = []
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [],
+    }
+    await app(scope, receive, send)
+    return statuses[0]
+
+
+@pytest.mark.asyncio
+async def test_load_shedder_limits_requests_in_flight() -> None:
+    release = asyncio.Event()
+
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        if scope["path"] == "/slow":
+            await release.wait()
+        await Response()(scope, receive, send)
+
+    shedder = LoadShedMiddleware(app, max_concurrent=1, max_pool_saturation=1)
+    slow = asyncio.create_task(call_asgi(shedder, "/slow"))
+    await asyncio.sleep(0)
+    assert shedder.in_flight == 1
+    assert await call_asgi(shedder, "/api/v1/books") == 503
+    assert await call_asgi(shedder, "/metrics") == 200
+
+    release.set()
+    assert await slow == 200
+    assert shedder.in_flight == 0
+    assert await call_asgi(shedder, "/api/v1/books") == 200
+
+
+@pytest.mark.asyncio
+async def test_load_shedder_sheds_on_saturated_pool(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        await Response()(scope, receive, send)
+
+    shedder = LoadShedMiddleware(app, max_concurrent=10, max_pool_saturation=0.9)
+    monkeypatch.setattr(middlewares, "pool_saturation", lambda engine: 0.5)
+    assert shedder._overload() is None
+    monkeypatch.setattr(middlewares, "pool_saturation", lambda engine: 0.9)
+    assert shedder._overload() == "db_pool"
+    assert await call_asgi(shedder, "/api/v1/books") == 503